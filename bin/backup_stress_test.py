@@ -17,9 +17,9 @@
 
 from __future__ import print_function
 
-from lunrclient.storage import StorageBackup, StorageVolume
-from lunrclient.base import LunrError
-import time
+from lunrclient.client import StorageClient
+from lunrclient.retry import RetryPolicy
+from lunrclient.base import missing_as_none
 import uuid
 import sys
 import os
@@ -37,8 +37,10 @@ def get_dm_name(volume):
 
 
 def main():
-    storage = StorageVolume(debug=True)
-    backup = StorageBackup(debug=True)
+    client = StorageClient(debug=True, retry=RetryPolicy(
+        retries=100, max_elapsed=600, statuses=(409,)))
+    storage = client.volumes
+    backup = client.backups
 
     for i in range(0, 20):
         volume_id = str(uuid.uuid4())
@@ -46,48 +48,28 @@ def main():
 
         # Create a volume, then a backup of the volume
         print("++ Vol: %s Backup: %s ++" % (volume_id, backup_id))
-        result = storage.create(volume_id, 1)
-        result = backup.create(backup_id, volume_id, 1)
+        storage.create(1, volume_id=volume_id)
+        backup.create(volume_id, backup_id=backup_id)
 
         # Wait until the storage node returns 404
-        while(result):
-            try:
-                result = backup.get(backup_id, volume_id)
-                os.system("ls %s*" % get_dm_name("/dev/lunr-volume/%s" % backup_id))
-                time.sleep(1)
-            except LunrError as e:
-                if e.code != 404:
-                    raise
-                # storage node returned 404
-                break
+        backup.poll(lambda: missing_as_none(backup.get, volume_id, backup_id),
+                    lambda result: result is None)
+        os.system("ls %s*" % get_dm_name("/dev/lunr-volume/%s" % backup_id))
 
         # Show the snapshot created
         os.system("ls %s*" % get_dm_name("/dev/lunr-volume/%s" % volume_id))
 
         # Because storage node will return 404 before the backup actually
         # completes we have to list the backup and wait until it shows up
-        while True:
-            result = backup.list(volume_id)
-            if backup_id in result.keys():
-                break
+        backup.wait_for(volume_id, backup_id)
 
         # Now delete the backup and wait until it goes away
         # (unable to use .get() as it will 404 even tho the backup exists)
-        result = backup.delete(backup_id, volume_id)
-        while(result):
-            result = backup.list(volume_id)
-            if backup_id not in result.keys():
-                break
-
-        # Attempt to delete the volume
-        while True:
-            try:
-                result = storage.delete(volume_id)
-                break
-            except LunrError as e:
-                # If we get 409, just try again
-                if e.code != 409:
-                    raise
+        backup.delete(volume_id, backup_id)
+        backup.wait_for_delete(volume_id, backup_id)
+
+        # Delete the volume, the client retries if we get 409
+        storage.delete(volume_id)
 
 
 if __name__ == "__main__":
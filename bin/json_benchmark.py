@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+
+# Copyright 2016 Rackspace US, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Compare the decode throughput of the installed json codecs
+on a volume listing like the one returned by 'lunr volume list'
+"""
+
+from __future__ import print_function
+
+from lunrclient.codec import available
+import argparse
+import random
+import time
+import uuid
+import json
+import sys
+
+
+def volume(nodes, accounts):
+    return {
+        'id': str(uuid.uuid4()),
+        'name': str(uuid.uuid4()),
+        'account_id': random.choice(accounts),
+        'node_id': random.choice(nodes),
+        'status': random.choice(['ACTIVE'] * 8 + ['DELETED', 'ERROR']),
+        'volume_type_name': random.choice(['vtype', 'ssd']),
+        'size': random.randint(1, 1024),
+        'restore_of': None,
+        'image_id': None,
+        'active_backup_id': None,
+        'created_at': '2016-05-03 17:25:46',
+        'last_modified': '2016-05-03 17:28:10',
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--volumes', type=int, default=100000,
+                        help="number of volumes in the listing")
+    parser.add_argument('--rounds', type=int, default=5,
+                        help="decode the listing this many times per codec")
+    args = parser.parse_args()
+
+    nodes = [str(uuid.uuid4()) for i in range(200)]
+    accounts = [str(uuid.uuid4()) for i in range(5000)]
+    body = json.dumps([volume(nodes, accounts)
+                       for i in range(args.volumes)]).encode('utf-8')
+    print("Listing of %d volumes, %0.1f MB"
+          % (args.volumes, len(body) / 1048576.0))
+
+    for codec in available():
+        best = None
+        for i in range(args.rounds):
+            start = time.time()
+            codec.loads(body)
+            elapsed = time.time() - start
+            best = elapsed if best is None else min(best, elapsed)
+        print("%-8s %8.3fs %10d volumes/s %8.1f MB/s"
+              % (codec.name, best, args.volumes / best,
+                 len(body) / 1048576.0 / best))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+# Copyright 2011-2016 Rackspace US, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Awaitable wrappers around the blocking clients (requires python 3)
+
+This is not asyncio native I/O. Every call is a blocking 'requests' call
+run on a thread pool with run_in_executor(), so at most 'concurrency'
+requests are in flight at once, however many coroutines await them.
+"""
+
+from lunrclient.client import LunrClient, StorageClient
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import asyncio
+
+
+DEFAULT_CONCURRENCY = 20
+
+
+def _get_loop():
+    try:
+        return asyncio.get_running_loop()
+    except (AttributeError, RuntimeError):
+        return asyncio.get_event_loop()
+
+
+class AsyncAPI(object):
+    """
+    Wraps a resource api such that its methods return awaitables
+    """
+
+    def __init__(self, api, executor):
+        self.api = api
+        self.executor = executor
+
+    def __getattr__(self, name):
+        method = getattr(self.api, name)
+        if name.startswith('_') or not callable(method):
+            return method
+
+        def call(*args, **kwargs):
+            return _get_loop().run_in_executor(
+                self.executor, partial(method, *args, **kwargs))
+        call.__name__ = name
+        call.__doc__ = method.__doc__
+        return call
+
+
+class AsyncClient(object):
+    """
+    Asyncio version of a client (requires python 3), for example
+
+        client = AsyncStorageClient('http://storage:8081')
+        volumes, status = await asyncio.gather(client.volumes.list(),
+                                               client.status.list())
+
+    Requests are made by the blocking client on a pool of 'concurrency'
+    worker threads sized to match its connection pool, so all coroutines
+    share warm connections. No more than 'concurrency' requests run at
+    once, the other coroutines wait for a free thread.
+    """
+
+    resources = []
+
+    def __init__(self, client, concurrency, executor=None):
+        self.client = client
+        self.concurrency = concurrency
+        self.executor = executor or ThreadPoolExecutor(concurrency)
+        self._own_executor = executor is None
+        for name in self.resources:
+            setattr(self, name, AsyncAPI(getattr(client, name),
+                                         self.executor))
+
+    def close(self):
+        """
+        Release the worker pool and the pooled connections
+        """
+        if self._own_executor:
+            self.executor.shutdown(wait=False)
+        self.client.transport.close()
+
+
+class AsyncLunrClient(AsyncClient):
+
+    resources = ['volumes', 'backups', 'accounts', 'nodes', 'exports']
+
+    def __init__(self, tenant_id, concurrency=DEFAULT_CONCURRENCY,
+                 executor=None, **kwargs):
+        kwargs.setdefault('pool_size', concurrency)
+        AsyncClient.__init__(self, LunrClient(tenant_id, **kwargs),
+                             concurrency, executor)
+
+    def as_tenant_id(self, tenant_id):
+        self.client.as_tenant_id(tenant_id)
+
+
+class AsyncStorageClient(AsyncClient):
+
+    resources = ['volumes', 'status', 'exports', 'backups']
+
+    def __init__(self, url=None, concurrency=DEFAULT_CONCURRENCY,
+                 executor=None, **kwargs):
+        kwargs.setdefault('pool_size', concurrency)
+        AsyncClient.__init__(self, StorageClient(url, **kwargs),
+                             concurrency, executor)
@@ -12,10 +12,61 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from __future__ import print_function
-
-import requests
+from lunrclient.transport import Transport
+from lunrclient.hooks import RequestEvent
+from threading import Lock
+import logging
 import json
+import time
+import six
+import sys
+import re
+
+
+# The amount of a streamed response body read at a time
+CHUNK_SIZE = 65536
+WHITESPACE = re.compile(r'[ \t\n\r]*')
+# The most characters of a request or response logged
+MAX_LOG_LENGTH = 2048
+
+log = logging.getLogger('lunrclient')
+log.addHandler(logging.NullHandler())
+DEBUG_LOCK = Lock()
+
+
+def enable_debug():
+    """
+    Print the 'lunrclient' debug log to stdout (what debug=True does).
+    Only the 'lunrclient' logger is changed and only the first time
+    """
+    with DEBUG_LOCK:
+        if any(getattr(h, 'lunr_debug', False) for h in log.handlers):
+            return
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(logging.Formatter('-- %(message)s'))
+        handler.lunr_debug = True
+        log.addHandler(handler)
+        log.setLevel(logging.DEBUG)
+        # Keep the debug messages out of the application's own handlers
+        log.propagate = False
+
+
+class Truncated(object):
+    """
+    Formats a value for the log only when the message is emitted,
+    'value' may be a callable that returns the value
+    """
+
+    def __init__(self, value, limit=MAX_LOG_LENGTH):
+        self.value = value
+        self.limit = limit
+
+    def __str__(self):
+        value = self.value() if callable(self.value) else self.value
+        text = "%s" % (value,)
+        if len(text) <= self.limit:
+            return text
+        return "%s... (%d characters)" % (text[:self.limit], len(text))
 
 
 class LunrError(Exception):
@@ -32,6 +83,10 @@ class LunrHttpError(LunrError):
         return self.msg
 
 
+class LunrTimeout(LunrError):
+    pass
+
+
 class ResponseList(list):
     def __init__(self, _list, code):
         self._code = code
@@ -56,10 +111,157 @@ def response(body, code):
     return ResponseDict(body, code)
 
 
+def missing_as_none(method, *args):
+    """
+    Call 'method' returning None instead of raising if the api returns 404
+    """
+    try:
+        return method(*args)
+    except LunrHttpError as e:
+        if e.code != 404:
+            raise
+        return None
+
+
+def has_status(status):
+    """
+    Return a predicate that is true if a resource has one of 'status',
+    'status' may be a single status, a list of them or a predicate
+    """
+    if callable(status):
+        return status
+    if isinstance(status, six.string_types):
+        status = [status]
+    return lambda resource: resource is not None \
+        and resource.get('status') in status
+
+
+class JSONStream(object):
+    """
+    Incrementally decodes a json list from a response body, yielding
+    each item as soon as it has been received. A body that is not a
+    list is decoded whole and yielded as a single item.
+
+    The response is closed when the items run out or on close(), call
+    it (or use a with block) when not reading every item
+
+        with client.volumes.stream() as volumes:
+            first = next(volumes)
+    """
+
+    def __init__(self, resp, chunk_size=CHUNK_SIZE):
+        if resp.encoding is None:
+            resp.encoding = 'utf-8'
+        self.resp = resp
+        self.chunks = resp.iter_content(chunk_size, decode_unicode=True)
+        self.decoder = json.JSONDecoder()
+        self.buf, self.pos, self.eof = '', 0, False
+        self.items = self.generate()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self.items)
+
+    next = __next__
+
+    def close(self):
+        """
+        Stop reading and release the connection
+        """
+        self.items.close()
+        self.resp.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def read(self):
+        """
+        Append the next chunk of the body to the buffer
+        """
+        if self.eof:
+            raise LunrError("truncated json list in response")
+        chunk = next(self.chunks, None)
+        self.eof = chunk is None
+        self.buf, self.pos = self.buf[self.pos:] + (chunk or ''), 0
+
+    def peek(self):
+        """
+        Skip whitespace and return the next character of the body
+        """
+        while True:
+            self.pos = WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            self.read()
+
+    def decode(self):
+        """
+        Decode the next item, reading more of the body until it is complete
+        """
+        while True:
+            try:
+                item, end = self.decoder.raw_decode(self.buf, self.pos)
+            except ValueError:
+                end = None
+            if end is not None and (self.eof or self.complete(end)):
+                self.pos = end
+                return item
+            self.read()
+
+    def complete(self, end):
+        """
+        True if the item decoded up to 'end' cannot continue in the next
+        chunk, a number such as '1.' or '1e' decodes as 1 but may not be
+        """
+        if self.buf[end - 1] in '}]"':
+            return True
+        # A number or literal is complete once the list goes on or ends
+        after = WHITESPACE.match(self.buf, end).end()
+        return after < len(self.buf) and self.buf[after] in ',]'
+
+    def generate(self):
+        try:
+            if self.peek() != '[':
+                text = self.buf[self.pos:] + ''.join(self.chunks)
+                try:
+                    item = json.loads(text)
+                except ValueError:
+                    raise LunrError("response is not json: %s"
+                                    % Truncated(text))
+                yield item
+                return
+            self.pos += 1
+            while True:
+                char = self.peek()
+                if char == ']':
+                    return
+                if char == ',':
+                    self.pos += 1
+                    continue
+                yield self.decode()
+        finally:
+            self.resp.close()
+
+
+def reason(resp):
+    # Proxies in front of the api may not return json
+    try:
+        return json.loads(resp.text)['reason']
+    except (ValueError, KeyError, TypeError):
+        return resp.text
+
+
 class BaseAPI(object):
 
     def __init__(self, client):
         self.debug = client.debug
+        if self.debug:
+            enable_debug()
         self.client = client
         self.headers = {
             "Content-Type": "application/json",
@@ -68,58 +270,185 @@ class BaseAPI(object):
         }
         if client.headers:
             self.headers.update(client.headers)
-        self.session = requests.Session()
-        self.session.headers.update(self.headers)
+        # Share the client's connection pool if it has one
+        self.transport = getattr(client, 'transport', None) or Transport()
+        self.session = self.transport.session
+        # How failed requests are retried, if at all
+        self.retry = getattr(client, 'retry', None)
+        # The stdlib json module serves as the default codec
+        self.codec = getattr(client, 'codec', None) or json
+        # Observers notified of each request, see lunrclient.hooks. The
+        # client's list is shared, hooks added to it later are notified
+        hooks = getattr(client, 'hooks', None)
+        self.hooks = [] if hooks is None else hooks
+        # A cache.ResponseCache for GET responses, if any
+        self.response_cache = getattr(client, 'response_cache', None)
 
     def buildUrl(self, uri):
         return "%s%s" % (self.client.url, uri)
 
     def http_request(self, call, url, **kwargs):
+        # Remove args with no value
+        kwargs = self.unused(kwargs)
+        if self.client.timeout:
+            kwargs['timeout'] = self.client.timeout
+
+        method = call.__name__.upper()
+        start = time.time()
+        attempt = 0
+        while True:
+            try:
+                if self.hooks:
+                    return self.observe(method, url, attempt, call, **kwargs)
+                return self.send(call, url, **kwargs)
+            except LunrError as e:
+                error = e
+            if not self.retry:
+                raise error
+            delay = self.retry.should_retry(method, attempt,
+                                            time.time() - start,
+                                            getattr(error, 'code', None))
+            if delay is None:
+                raise error
+            log.info("retry %s on %s in %0.2fs after: %s",
+                     method, url, delay, error)
+            self.retry.sleep(delay)
+            attempt += 1
+
+    def notify(self, name, event):
+        for hook in self.hooks:
+            getattr(hook, name)(event)
+
+    def observe(self, method, url, attempt, call, **kwargs):
+        """
+        Send the request, notifying our hooks before and after
+        """
+        event = RequestEvent(method, url, attempt)
+        self.notify('pre_request', event)
+        try:
+            result = self.send(call, url, event, **kwargs)
+        except LunrError as e:
+            exc_info = sys.exc_info()
+            event.finish(e)
+            self.notify('on_error', event)
+            six.reraise(*exc_info)
+        event.finish()
+        self.notify('post_response', event)
+        return result
+
+    def request_headers(self, cached=None):
+        # Headers are sent per request as the session may be shared
+        if cached is None:
+            return self.headers
+        # Ask the server to only send the body if it changed
+        return dict(self.headers, **cached.validators())
+
+    def send(self, call, url, event=None, cache_key=None, cached=None,
+             **kwargs):
+        import requests
         try:
-            # Remove args with no value
-            kwargs = self.unused(kwargs)
-            if self.client.timeout:
-                kwargs['timeout'] = self.client.timeout
-
-            if self.debug:
-                print("-- %s on %s with %s " % (call.__name__.upper(),
-                                                url, kwargs))
-            resp = call(url, **kwargs)
-            if self.debug:
-                print("-- response: %s " % resp.text)
+            debug = log.isEnabledFor(logging.DEBUG)
+            if debug:
+                log.debug("%s on %s with %s", call.__name__.upper(), url,
+                          Truncated(kwargs))
+            resp = call(url, headers=self.request_headers(cached), **kwargs)
+            stream = kwargs.get('stream')
+            if event is not None:
+                event.received(resp, stream)
+            if debug and not stream:
+                log.debug("response: %s", Truncated(lambda: resp.text))
+            if cached is not None and resp.status_code == 304:
+                self.response_cache.refresh(cached)
+                return self.decode(cached.body)
             if resp.status_code != 200:
                 raise LunrHttpError("%s returned '%s' with '%s'" %
-                                    (url, resp.status_code,
-                                     json.loads(resp.text)['reason']),
+                                    (url, resp.status_code, reason(resp)),
                                     resp.status_code)
-            return response(json.loads(resp.text), resp.status_code)
+            if stream:
+                return JSONStream(resp)
+            if cache_key is not None:
+                self.response_cache.put(cache_key, resp.text, resp.headers)
+            # Decoding the raw bytes avoids guessing the text encoding
+            return response(self.loads(url, resp.content, resp.status_code),
+                            resp.status_code)
         except requests.RequestException as e:
             raise LunrError(str(e))
 
+    def loads(self, url, body, code=200):
+        try:
+            return self.codec.loads(body)
+        except ValueError:
+            # Proxies in front of the api may answer with html
+            raise LunrHttpError("%s returned '%s' with a body that is not "
+                                "json: %s" % (url, code, Truncated(body)),
+                                code)
+
+    def decode(self, body):
+        return response(self.loads('cached response', body), 200)
+
     def http_get(self, uri, **kwargs):
+        url = self.buildUrl(uri)
+        if self.response_cache is None:
+            return self.http_request(self.session.get, url, **kwargs)
+        key = self.response_cache.key(url, kwargs.get('params'))
+        entry = self.response_cache.get(key)
+        if entry is not None and entry.fresh():
+            return self.decode(entry.body)
+        return self.http_request(self.session.get, url, cache_key=key,
+                                 cached=entry, **kwargs)
+
+    def modify(self, call, url, **kwargs):
+        try:
+            return self.http_request(call, url, **kwargs)
+        finally:
+            # Whether or not the write succeeded, cached reads are suspect
+            if self.response_cache is not None:
+                self.response_cache.invalidate(url)
+
+    def http_stream(self, uri, **kwargs):
+        """
+        GET a json list, returning a generator that decodes
+        each item as the response body is received
+        """
         return self.http_request(self.session.get,
-                                 self.buildUrl(uri), **kwargs)
+                                 self.buildUrl(uri), stream=True, **kwargs)
 
     def http_put(self, uri, **kwargs):
-        return self.http_request(self.session.put,
-                                 self.buildUrl(uri), **kwargs)
+        return self.modify(self.session.put, self.buildUrl(uri), **kwargs)
 
     def http_delete(self, uri, **kwargs):
-        return self.http_request(self.session.delete,
-                                 self.buildUrl(uri), **kwargs)
+        return self.modify(self.session.delete, self.buildUrl(uri), **kwargs)
 
     def http_post(self, uri, **kwargs):
-        return self.http_request(self.session.post,
-                                 self.buildUrl(uri), **kwargs)
+        return self.modify(self.session.post, self.buildUrl(uri), **kwargs)
+
+    def poll(self, fetch, until, timeout=300, interval=1, max_interval=30):
+        """
+        Call 'fetch' until 'until(result)' is true and return the result.
+        The time between polls grows from 'interval' to 'max_interval',
+        raises LunrTimeout if 'timeout' seconds pass first
+        """
+        deadline = time.time() + timeout
+        while True:
+            result = fetch()
+            if until(result):
+                return result
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                raise LunrTimeout("gave up waiting after %s seconds"
+                                  % timeout)
+            time.sleep(min(interval, remaining))
+            interval = min(interval * 1.5, max_interval)
 
     def unused(self, _dict):
         """
         Remove empty parameters from the dict
         """
-        for key, value in _dict.items():
-            if value is None:
-                del _dict[key]
-        return _dict
+        # Most calls have nothing to remove, avoid copying the dict
+        if not any(value is None for value in _dict.values()):
+            return _dict
+        return dict((key, value) for key, value in _dict.items()
+                    if value is not None)
 
     def required(self, method, _dict, require):
         """
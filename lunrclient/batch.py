@@ -0,0 +1,119 @@
+# Copyright 2011-2016 Rackspace US, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from lunrclient.base import LunrError
+from six.moves.urllib.parse import urlparse
+from collections import namedtuple
+from threading import Lock, Semaphore
+import six
+
+
+DEFAULT_CONCURRENCY = 10
+
+BatchResult = namedtuple('BatchResult', ['index', 'method', 'args',
+                                         'kwargs', 'result', 'error'])
+
+
+class Batch(object):
+    """
+    Runs many api calls with a limit on how many are in flight at once,
+    overall and per host. For example
+
+        batch = client.batch(concurrency=20)
+        for id in ids:
+            batch.submit('volumes.delete', id)
+        for result in batch.run():
+            if result.error:
+                print("%s failed: %s" % (result.args[0], result.error))
+
+    Give the client a 'pool_size' of at least 'concurrency' so each
+    call has a pooled connection available.
+    """
+
+    def __init__(self, client=None, concurrency=DEFAULT_CONCURRENCY,
+                 per_host=None):
+        self.client = client
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.calls = []
+        self.limits = {}
+        self.lock = Lock()
+
+    def submit(self, method, *args, **kwargs):
+        """
+        Queue a call to 'method', which is a bound api method such as
+        client.volumes.create or its name 'volumes.create' on our client
+        """
+        if isinstance(method, six.string_types):
+            method = self.resolve(method)
+        self.calls.append((method, args, kwargs))
+        return self
+
+    def resolve(self, name):
+        if self.client is None:
+            raise LunrError("Batch() requires a client to call '%s'" % name)
+        result = self.client
+        for attr in name.split('.'):
+            result = getattr(result, attr)
+        return result
+
+    def host(self, method):
+        # Bound api methods know which client (and host) they talk to
+        client = getattr(getattr(method, '__self__', None), 'client', None)
+        url = getattr(client, 'url', None)
+        if not url:
+            return None
+        return urlparse(url).netloc
+
+    def limit(self, host):
+        with self.lock:
+            if host not in self.limits:
+                self.limits[host] = Semaphore(self.per_host)
+            return self.limits[host]
+
+    def call(self, item):
+        index, (method, args, kwargs) = item
+        host = self.host(method)
+        if self.per_host and host:
+            with self.limit(host):
+                return self._call(index, method, args, kwargs)
+        return self._call(index, method, args, kwargs)
+
+    def _call(self, index, method, args, kwargs):
+        name = getattr(method, '__name__', str(method))
+        try:
+            result = method(*args, **kwargs)
+        except Exception as e:
+            # Any failure belongs to this call, the others carry on
+            return BatchResult(index, name, args, kwargs, None, e)
+        return BatchResult(index, name, args, kwargs, result, None)
+
+    def run(self):
+        """
+        Run all the queued calls, yielding a BatchResult for each as it
+        completes. 'index' is the order the call was submitted in
+        """
+        calls, self.calls = self.calls, []
+        if not calls:
+            return
+        # Imported here to keep the command line quick to start
+        from multiprocessing.pool import ThreadPool
+        pool = ThreadPool(min(self.concurrency, len(calls)))
+        try:
+            for result in pool.imap_unordered(self.call, enumerate(calls)):
+                yield result
+        finally:
+            # Abandon any remaining calls if the caller stopped early
+            pool.terminate()
+            pool.join()
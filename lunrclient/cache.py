@@ -0,0 +1,284 @@
+# Copyright 2011-2016 Rackspace US, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from os.path import join, expanduser, dirname
+from collections import OrderedDict
+from threading import Lock
+import hashlib
+import calendar
+import json
+import time
+import os
+
+
+# Don't hand out tokens that are about to expire
+EXPIRE_MARGIN = 60
+
+
+def cache_dir():
+    """
+    Return the directory lunrclient should keep cached data in
+    """
+    base = os.environ.get('XDG_CACHE_HOME') or expanduser('~/.cache')
+    return join(base, 'lunrclient')
+
+
+def write_private(path, data):
+    """
+    Atomically write 'data' to a file only the current user can read
+    """
+    directory = dirname(path)
+    if not os.path.isdir(directory):
+        os.makedirs(directory, 0o700)
+    tmp = "%s.%s.tmp" % (path, os.getpid())
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'w') as file:
+        file.write(data)
+    os.rename(tmp, path)
+
+
+def parse_expires(expires):
+    """
+    Convert a keystone expiry (2016-01-01T00:00:00Z) to epoch seconds
+    """
+    return calendar.timegm(time.strptime(expires[:19], '%Y-%m-%dT%H:%M:%S'))
+
+
+class TokenCache(object):
+    """
+    On disk cache of auth tokens and tenant ids, entries are
+    keyed by auth url, tenant name and user and are only returned
+    until the token expires
+    """
+
+    def __init__(self, path=None):
+        self.path = expanduser(path or join(cache_dir(), 'tokens.json'))
+
+    def key(self, auth_url, tenant_name, user):
+        return hashlib.sha1(("%s|%s|%s" % (auth_url, tenant_name, user))
+                            .encode('utf-8')).hexdigest()
+
+    def load(self):
+        try:
+            with open(self.path) as file:
+                return json.load(file)
+        except (IOError, OSError, ValueError):
+            return {}
+
+    def get(self, key):
+        """
+        Return the cached entry for 'key' or None if missing or expired
+        """
+        entry = self.load().get(key)
+        if entry and entry['expires'] - EXPIRE_MARGIN > time.time():
+            return entry
+        return None
+
+    def put(self, key, token, tenant_id, expires):
+        now = time.time()
+        # Drop any expired entries while we are here
+        entries = dict((k, v) for k, v in self.load().items()
+                       if v['expires'] > now)
+        entries[key] = {'token': token, 'tenant_id': tenant_id,
+                        'expires': expires}
+        try:
+            write_private(self.path, json.dumps(entries))
+        except (IOError, OSError):
+            # The cache is only an optimization
+            pass
+
+
+# Endpoints whose data rarely changes
+READ_MOSTLY = ('/v1.0/{tenant_id}/nodes', '/v1.0/{tenant_id}/nodes/{id}',
+               '/v1.0/{tenant_id}/accounts',
+               '/v1.0/{tenant_id}/accounts/{id}')
+
+
+def sha1(value):
+    return hashlib.sha1(value.encode('utf-8')).hexdigest()
+
+
+def collection(url):
+    """
+    Return the url of the collection 'url' belongs to, such that
+    'http://host/volumes/vol-1/export' returns 'http://host/volumes'
+    """
+    # Imported here as bash completion only needs cache_dir()
+    from lunrclient.hooks import COLLECTIONS
+    from six.moves.urllib.parse import urlparse
+    parts = urlparse(url)
+    path = parts.path.split('/')
+    for i, part in enumerate(path):
+        if part in COLLECTIONS:
+            path = path[:i + 1]
+            break
+    return "%s://%s%s" % (parts.scheme, parts.netloc, '/'.join(path))
+
+
+class CacheEntry(object):
+
+    def __init__(self, key, body, etag=None, last_modified=None,
+                 expires=0):
+        self.key = key
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.expires = expires
+
+    def fresh(self):
+        return time.time() < self.expires
+
+    def validators(self):
+        """
+        Return the headers that make a request for this entry conditional
+        """
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+    def to_dict(self):
+        return {'key': self.key, 'body': self.body, 'etag': self.etag,
+                'last_modified': self.last_modified,
+                'expires': self.expires}
+
+
+class ResponseCache(object):
+    """
+    Caches the bodies of GET responses in memory and optionally on disk.
+    Entries are served without a request for their TTL, after which
+    they are revalidated with If-None-Match/If-Modified-Since when the
+    server gave an ETag or Last-Modified. Writes through a client
+    sharing this cache drop the entries of the collection written to
+
+    :param ttl: seconds to serve an entry without revalidating it
+    :param ttls: a ttl per url template, such as
+                 {'/v1.0/{tenant_id}/nodes': 300}, overriding 'ttl'
+    :param max_entries: the most entries kept in memory
+    :param path: a directory to also keep entries in, None for memory only
+    """
+
+    def __init__(self, ttl=0, ttls=None, max_entries=1024, path=None):
+        self.ttl = ttl
+        self.ttls = ttls or {}
+        self.max_entries = max_entries
+        self.path = expanduser(path) if path else None
+        self.entries = OrderedDict()
+        self.lock = Lock()
+
+    def key(self, url, params=None):
+        from six.moves.urllib.parse import urlencode
+        if not params:
+            return url
+        return "%s?%s" % (url, urlencode(sorted(params.items())))
+
+    def ttl_for(self, url):
+        from lunrclient.hooks import url_template
+        from six.moves.urllib.parse import urlparse
+        return self.ttls.get(url_template(urlparse(url).path), self.ttl)
+
+    def filename(self, key):
+        # Prefix with the collection so invalidate() can find the files
+        return join(self.path, "%s-%s.json" % (sha1(collection(key))[:16],
+                                               sha1(key)))
+
+    def get(self, key):
+        """
+        Return the entry for 'key', fresh or stale, or None
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.pop(key)
+                self.entries[key] = entry
+                return entry
+        if self.path:
+            entry = self.load(key)
+            if entry is not None:
+                self.remember(entry)
+        return entry
+
+    def load(self, key):
+        try:
+            with open(self.filename(key)) as file:
+                entry = CacheEntry(**json.load(file))
+        except (IOError, OSError, ValueError, TypeError):
+            return None
+        # Guard against a hash collision
+        return entry if entry.key == key else None
+
+    def remember(self, entry):
+        with self.lock:
+            self.entries.pop(entry.key, None)
+            self.entries[entry.key] = entry
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def store(self, entry):
+        self.remember(entry)
+        if not self.path:
+            return
+        try:
+            write_private(self.filename(entry.key),
+                          json.dumps(entry.to_dict()))
+        except (IOError, OSError):
+            # The cache is only an optimization
+            pass
+
+    def put(self, key, body, headers):
+        """
+        Cache the text 'body' of a response with 'headers'
+        """
+        ttl = self.ttl_for(key)
+        entry = CacheEntry(key, body, headers.get('ETag'),
+                           headers.get('Last-Modified'), time.time() + ttl)
+        # Without a ttl or validators the entry is never useful
+        if ttl > 0 or entry.etag or entry.last_modified:
+            self.store(entry)
+
+    def refresh(self, entry):
+        """
+        The server confirmed 'entry' is current, serve it for another ttl
+        """
+        entry.expires = time.time() + self.ttl_for(entry.key)
+        self.store(entry)
+
+    def invalidate(self, url):
+        """
+        Drop every entry in the collection 'url' belongs to
+        """
+        prefix = collection(url)
+        with self.lock:
+            for key in list(self.entries):
+                if collection(key) == prefix:
+                    del self.entries[key]
+        if not self.path or not os.path.isdir(self.path):
+            return
+        start = sha1(prefix)[:16] + '-'
+        for name in os.listdir(self.path):
+            if name.startswith(start):
+                try:
+                    os.unlink(join(self.path, name))
+                except OSError:
+                    pass
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+        if self.path and os.path.isdir(self.path):
+            for name in os.listdir(self.path):
+                if name.endswith('.json'):
+                    os.unlink(join(self.path, name))
@@ -12,20 +12,25 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from __future__ import print_function
-
 import os
-import json
 
 from lunrclient.lunr import LunrVolume, LunrBackup, LunrAccount, LunrNode, LunrExport
 from lunrclient.storage import StorageVolume, StorageStatus, StorageExport, StorageBackup
-from lunrclient.base import BaseAPI, LunrError
+from lunrclient.base import BaseAPI, LunrError, log
+from lunrclient.transport import Transport
+from lunrclient.cache import parse_expires
+from lunrclient.batch import Batch, DEFAULT_CONCURRENCY
+from lunrclient.codec import get_codec
+from lunrclient.directory import NodeDirectory
 
 
 class LunrClient(object):
 
     def __init__(self, tenant_id, debug=False, timeout=None,
-                 http_agent=None, url=None, headers=None):
+                 http_agent=None, url=None, headers=None,
+                 transport=None, pool_size=None, keep_alive=True,
+                 retry=None, codec=None, hooks=None, response_cache=None,
+                 records=False):
         self.headers = headers
         if http_agent:
             if not self.headers:
@@ -36,26 +41,80 @@ class LunrClient(object):
         self.tenant_id = tenant_id
         self.url = url
         self.timeout = timeout
+        # A RetryPolicy for transient failures, None to never retry
+        self.retry = retry
+        # The json codec (or its name), defaults to the fastest installed
+        self.codec = get_codec(codec)
+        # Observers of each request such as hooks.TimingCollector()
+        self.hooks = [] if hooks is None else hooks
+        # A cache.ResponseCache to serve repeated GETs from
+        self.response_cache = response_cache
+        # Return listings as compact records.Record objects, not dicts
+        self.records = records
 
         if self.tenant_id is None:
             raise LunrError("LunrClient() requires valid tenant_id")
         if self.url is None:
             self.url = os.environ.get('LUNR_API_URL', 'http://localhost:8080')
 
+        # All the resource apis share a single connection pool
+        self.transport = transport or Transport(pool_size=pool_size,
+                                                keep_alive=keep_alive)
         self.volumes = LunrVolume(self)
         self.backups = LunrBackup(self)
         self.accounts = LunrAccount(self)
         self.nodes = LunrNode(self)
         self.exports = LunrExport(self)
+        self._directory = None
 
     def as_tenant_id(self, tenant_id):
         self.tenant_id = tenant_id
 
+    @property
+    def directory(self):
+        """
+        A NodeDirectory of the nodes, loaded on first use
+        """
+        if self._directory is None:
+            self._directory = NodeDirectory(self)
+        return self._directory
+
+    def batch(self, concurrency=DEFAULT_CONCURRENCY, per_host=None):
+        """
+        Return a Batch that runs many calls on this client concurrently
+        """
+        return Batch(self, concurrency, per_host)
+
+    def iter_volumes(self, limit=100, prefetch=False, **filters):
+        """
+        Iterate the volumes a page at a time, see pages.Pages
+        """
+        return self.volumes.pages(limit, prefetch, **filters)
+
+    def iter_backups(self, limit=100, prefetch=False, **filters):
+        return self.backups.pages(limit, prefetch, **filters)
+
+    def iter_accounts(self, limit=100, prefetch=False, **filters):
+        return self.accounts.pages(limit, prefetch, **filters)
+
+    def iter_nodes(self, limit=100, prefetch=False, **filters):
+        return self.nodes.pages(limit, prefetch, **filters)
+
 
 class StorageClient(object):
 
-    def __init__(self, url=None, debug=False, headers=None, timeout=None):
+    def __init__(self, url=None, debug=False, headers=None, timeout=None,
+                 transport=None, pool_size=None, keep_alive=True,
+                 retry=None, codec=None, hooks=None, response_cache=None):
         self.timeout = timeout
+        # A RetryPolicy for transient failures, None to never retry
+        self.retry = retry
+        # The json codec (or its name), defaults to the fastest installed
+        self.codec = get_codec(codec)
+        # Observers of each request such as hooks.TimingCollector()
+        self.hooks = [] if hooks is None else hooks
+        # A cache.ResponseCache to serve repeated GETs from
+        self.response_cache = response_cache
         self.headers = headers
         self.debug = debug
         self.version = '1'
@@ -64,16 +123,26 @@ class StorageClient(object):
             self.url = os.environ.get('LUNR_STORAGE_URL',
                                       'http://localhost:8081')
 
+        # All the resource apis share a single connection pool
+        self.transport = transport or Transport(pool_size=pool_size,
+                                                keep_alive=keep_alive)
         self.volumes = StorageVolume(self)
         self.status = StorageStatus(self)
         self.exports = StorageExport(self)
         self.backups = StorageBackup(self)
 
+    def batch(self, concurrency=DEFAULT_CONCURRENCY, per_host=None):
+        """
+        Return a Batch that runs many calls on this client concurrently
+        """
+        return Batch(self, concurrency, per_host)
+
 
 class Auth(BaseAPI):
 
     def __init__(self, auth_url, tenant_name, user, password,
-                 debug=False, headers=None, timeout=None):
+                 debug=False, headers=None, timeout=None, cache=None,
+                 codec=None, hooks=None):
         self.tenant_name = tenant_name
         self.password = password
         self.auth_url = auth_url
@@ -81,9 +150,21 @@ class Auth(BaseAPI):
         self.timeout = timeout
         self.debug = debug
         self.user = user
+        self.cache = cache
+        self.codec = get_codec(codec)
+        # Observers of each request such as hooks.TimingCollector()
+        self.hooks = [] if hooks is None else hooks
+        self.token = None
         BaseAPI.__init__(self, self)
 
     def fetch_tenant_id(self):
+        if self.cache:
+            key = self.cache.key(self.auth_url, self.tenant_name, self.user)
+            entry = self.cache.get(key)
+            if entry:
+                self.token = entry['token']
+                return entry['tenant_id']
+
         payload = {
             "auth": {
                 "tenantName": self.tenant_name,
@@ -96,7 +177,11 @@ class Auth(BaseAPI):
         # Can't use http_post because we are encoding json in the body
         resp = self.http_request(self.session.post,
                                  "%s/tokens" % self.auth_url,
-                                 data=json.dumps(payload))
-        if self.debug:
-            print("-- DDI: ", resp['access']['token']['tenant']['id'])
-        return resp['access']['token']['tenant']['id']
+                                 data=self.codec.dumps(payload))
+        token = resp['access']['token']
+        log.debug("DDI: %s", token['tenant']['id'])
+        self.token = token['id']
+        if self.cache:
+            self.cache.put(key, token['id'], token['tenant']['id'],
+                           parse_expires(token['expires']))
+        return token['tenant']['id']
@@ -0,0 +1,99 @@
+# Copyright 2011-2016 Rackspace US, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from lunrclient.base import LunrError
+import json
+import six
+
+
+class JSONCodec(object):
+    """
+    Encodes request bodies and decodes responses using the stdlib json
+    """
+    name = 'json'
+
+    def loads(self, data):
+        """
+        Decode 'data' which may be bytes or text
+        """
+        return json.loads(data)
+
+    def dumps(self, obj):
+        return json.dumps(obj)
+
+
+class UJSONCodec(JSONCodec):
+    name = 'ujson'
+
+    def __init__(self):
+        import ujson
+        self.loads = ujson.loads
+        self.dumps = ujson.dumps
+
+
+class OrjsonCodec(JSONCodec):
+    name = 'orjson'
+
+    def __init__(self):
+        import orjson
+        self.orjson = orjson
+        self.loads = orjson.loads
+
+    def dumps(self, obj):
+        # orjson encodes to bytes
+        return self.orjson.dumps(obj).decode('utf-8')
+
+
+# Fastest first
+CODECS = [OrjsonCodec, UJSONCodec, JSONCodec]
+_default = []
+
+
+def get_codec(codec=None):
+    """
+    Return a codec; 'codec' may be a codec instance, the name of a codec
+    or None for the fastest codec installed
+    """
+    if codec is None:
+        if not _default:
+            _default.append(fastest())
+        return _default[0]
+    if not isinstance(codec, six.string_types):
+        return codec
+
+    for cls in CODECS:
+        if cls.name == codec:
+            try:
+                return cls()
+            except ImportError:
+                raise LunrError("json codec '%s' is not installed" % codec)
+    raise LunrError("unknown json codec '%s'; choose from %s"
+                    % (codec, ', '.join(cls.name for cls in CODECS)))
+
+
+def available():
+    """
+    Return an instance of each installed codec
+    """
+    result = []
+    for cls in CODECS:
+        try:
+            result.append(cls())
+        except ImportError:
+            continue
+    return result
+
+
+def fastest():
+    return available()[0]
@@ -0,0 +1,90 @@
+# Copyright 2011-2016 Rackspace US, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import print_function
+
+from lunrclient.cache import cache_dir
+from os.path import dirname, abspath, getmtime, join
+from importlib import import_module
+import json
+import sys
+import os
+
+
+def index_path(prog):
+    """
+    Return where the completion index for 'prog' is cached
+    """
+    return join(cache_dir(), 'completion-%s' % prog)
+
+
+def signature():
+    # Any change to the installed package invalidates the index
+    directory = dirname(abspath(__file__))
+    return max(getmtime(join(directory, name))
+               for name in os.listdir(directory) if name.endswith('.py'))
+
+
+def load(path):
+    """
+    Return the cached index or None if it is missing or out of date
+    """
+    try:
+        with open(path) as file:
+            cached = json.load(file)
+    except (IOError, OSError, ValueError):
+        return None
+    if cached.get('signature') != signature():
+        return None
+    return cached
+
+
+def save(path, commands, index):
+    tmp = "%s.%s.tmp" % (path, os.getpid())
+    try:
+        if not os.path.isdir(dirname(path)):
+            os.makedirs(dirname(path))
+        with open(tmp, 'w') as file:
+            json.dump({'signature': signature(), 'commands': commands,
+                       'index': index}, file)
+        os.rename(tmp, path)
+    except (IOError, OSError):
+        # The index is only an optimization
+        pass
+
+
+def complete(cached, args):
+    # args = ['--bash-completion', '%prog', 'sub-command', 'command']
+    if len(args) > 2 and args[2] in cached['commands']:
+        print(' '.join(cached['index'].get(args[2], [])), end=' ')
+    else:
+        print(' '.join(cached['commands']))
+    return 0
+
+
+def run(prog, module):
+    # Answer bash completion without importing the command line modules
+    if '--bash-completion' in sys.argv:
+        cached = load(index_path(prog))
+        if cached:
+            return complete(cached, sys.argv[1:])
+    return import_module(module).main()
+
+
+def lunr_main():
+    return run('lunr', 'lunrclient.lunr_shell')
+
+
+def storage_main():
+    return run('storage', 'lunrclient.storage_shell')
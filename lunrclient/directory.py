@@ -0,0 +1,146 @@
+# Copyright 2011-2016 Rackspace US, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from lunrclient.lunr import storage_url
+from lunrclient.transport import registry
+from threading import Lock
+import time
+
+
+# The least seconds between refreshes caused by unknown keys
+MISS_INTERVAL = 1
+
+
+class NodeDirectory(object):
+    """
+    Loads the nodes once and indexes them by id, name, hostname and
+    volume type. The directory refreshes when older than 'max_age'
+    seconds or when asked for an id it does not know
+
+        node = client.directory.get(volume['node_id'])
+        storage = client.directory.storage_client(volume['node_id'])
+    """
+
+    def __init__(self, client, max_age=300):
+        self.client = client
+        self.max_age = max_age
+        self.nodes = {}
+        self.names = {}
+        self.hostnames = {}
+        self.types = {}
+        self.clients = {}
+        self.loaded = None
+        # The (index, key) pairs not found since the directory expired
+        self.missed = set()
+        self.lock = Lock()
+
+    def refresh(self):
+        """
+        Fetch the nodes and re-index those modified since the last refresh
+        """
+        nodes = self.client.nodes.list()
+        with self.lock:
+            current = {}
+            for node in nodes:
+                known = self.nodes.get(node['id'])
+                if known is not None \
+                        and known.get('last_modified') \
+                        == node.get('last_modified'):
+                    current[node['id']] = known
+                    continue
+                current[node['id']] = node
+                # The node may have moved, drop the old storage client
+                self.clients.pop(node['id'], None)
+            self.index(current)
+            self.loaded = time.time()
+
+    def index(self, nodes):
+        names, hostnames, types = {}, {}, {}
+        for node in nodes.values():
+            names[node['name']] = node
+            hostnames[node['hostname']] = node
+            types.setdefault(node['volume_type_name'], []).append(node)
+        for node_id in set(self.clients) - set(nodes):
+            del self.clients[node_id]
+        self.nodes, self.names = nodes, names
+        self.hostnames, self.types = hostnames, types
+
+    def expired(self):
+        return self.loaded is None \
+            or time.time() - self.loaded > self.max_age
+
+    def lookup(self, index, key):
+        # Volumes that are NEW or DELETED have no node
+        if key is None:
+            return None
+        if self.expired():
+            self.refresh()
+            self.missed = set()
+        node = getattr(self, index).get(key)
+        if node is None and (index, key) not in self.missed \
+                and time.time() - self.loaded > MISS_INTERVAL:
+            # The node may be new since the last refresh
+            self.refresh()
+            node = getattr(self, index).get(key)
+            if node is None:
+                # Not asked for again until the directory expires
+                self.missed.add((index, key))
+        return node
+
+    def get(self, node_id):
+        """
+        Return the node with 'node_id' or None
+        """
+        return self.lookup('nodes', node_id)
+
+    def by_name(self, name):
+        return self.lookup('names', name)
+
+    def by_hostname(self, hostname):
+        return self.lookup('hostnames', hostname)
+
+    def of_type(self, volume_type_name):
+        """
+        Return the nodes that host 'volume_type_name' volumes
+        """
+        return self.lookup('types', volume_type_name) or []
+
+    def all(self):
+        if self.expired():
+            self.refresh()
+        return list(self.nodes.values())
+
+    def storage_client(self, node_id):
+        """
+        Return a StorageClient for the node with 'node_id', sharing any
+        warm connections to the node
+        """
+        from lunrclient.client import StorageClient
+        with self.lock:
+            client = self.clients.get(node_id)
+        if client is not None:
+            return client
+        node = self.get(node_id)
+        if node is None:
+            return None
+        url = storage_url(node)
+        client = StorageClient(url, debug=self.client.debug,
+                               timeout=self.client.timeout,
+                               retry=self.client.retry,
+                               codec=self.client.codec,
+                               hooks=self.client.hooks,
+                               transport=registry.get(url))
+        with self.lock:
+            self.clients[node_id] = client
+        return client
@@ -14,16 +14,206 @@
 
 from __future__ import print_function
 
-from prettytable import PrettyTable
+from lunrclient.base import response
+from lunrclient.records import Record, plain
+from itertools import islice
+import json
+import six
+import sys
+
+
+# Every format but 'table' is written a record at a time
+FORMATS = ('table', 'json', 'jsonl', 'csv', 'tsv')
+# The options added by Displayable.display_options()
+DISPLAY_OPTIONS = ('output_format', 'max_width', 'max_rows', 'fields')
+# The types displayed as a single item rather than a list
+MAPPINGS = (dict, Record)
+# Table rows are written to stdout this many at a time
+CHUNK_ROWS = 1000
+
+
+def records(results):
+    # A single record is written as a list of one
+    if isinstance(results, MAPPINGS):
+        return iter([results])
+    return iter(results)
+
+
+def write_json(out, results, headers=None):
+    if isinstance(results, MAPPINGS):
+        out.write(json.dumps(results, default=plain) + '\n')
+        return
+    out.write('[')
+    for i, record in enumerate(results):
+        out.write((',\n' if i else '\n') + json.dumps(record, default=plain))
+    out.write('\n]\n')
+
+
+def write_jsonl(out, results, headers=None):
+    for record in records(results):
+        out.write(json.dumps(record, default=plain) + '\n')
+
+
+def cell(value):
+    if value is None:
+        return ''
+    if isinstance(value, (dict, list)):
+        value = json.dumps(value)
+    value = six.text_type(value)
+    # The python 2 csv module only writes bytes
+    return value.encode('utf-8') if six.PY2 else value
+
+
+def write_delimited(out, results, headers=None, delimiter=','):
+    import csv
+    writer = csv.writer(out, delimiter=delimiter, lineterminator='\n')
+    for i, record in enumerate(records(results)):
+        if i == 0:
+            # Without headers the columns are those of the first record
+            headers = headers or list(record.keys())
+            writer.writerow([cell(header) for header in headers])
+        writer.writerow([cell(record.get(key)) for key in headers])
+
+
+WRITERS = {
+    'json': write_json,
+    'jsonl': write_jsonl,
+    'csv': write_delimited,
+    'tsv': lambda out, results, headers: write_delimited(out, results,
+                                                         headers, '\t'),
+}
+
+
+def project(record, fields):
+    """
+    Return a copy of 'record' with only the keys in 'fields'
+    """
+    return dict((key, record[key]) for key in fields if key in record)
+
+
+def text(value, max_width=None):
+    """
+    Return the table cell for 'value', cut to 'max_width' characters
+    """
+    value = "%s" % (value,)
+    if '\n' in value:
+        value = value.replace('\n', ' ')
+    if max_width and len(value) > max_width:
+        return value[:max(max_width - 3, 0)] + '...'
+    return value
+
+
+def write_table(out, rows, headers, max_width=None):
+    """
+    Write 'rows' as a table like PrettyTable does; the column widths
+    are measured in one pass before any row is written
+    """
+    # A missing key is a blank cell, None is printed as 'None'
+    cells = [[text(row[key], max_width) if key in row else ''
+              for key in headers] for row in rows]
+    headers = [text(header, max_width) for header in headers]
+    widths = [len(header) for header in headers]
+    for row in cells:
+        for i, value in enumerate(row):
+            if len(value) > widths[i]:
+                widths[i] = len(value)
+
+    border = '+%s+' % '+'.join('-' * (width + 2) for width in widths)
+
+    def line(row):
+        # str.center() pads odd widths the same way PrettyTable does
+        return '| %s |' % ' | '.join(value.center(width)
+                                     for value, width in zip(row, widths))
+
+    out.write('\n'.join([border, line(headers), border]) + '\n')
+    for start in range(0, len(cells), CHUNK_ROWS):
+        out.write(''.join(line(row) + '\n'
+                          for row in cells[start:start + CHUNK_ROWS]))
+    out.write(border + '\n')
 
 
 class Displayable(object):
 
+    def display_options(self):
+        """
+        Add the options that control how results are printed
+        """
+        self.opt('--format', dest='output_format', choices=FORMATS,
+                 default='table', help="print the results as a table "
+                 "(default), json, jsonl, csv or tsv")
+        self.opt('--max-width', type=int, default=None,
+                 help="cut table cells longer than this")
+        self.opt('--max-rows', type=int, default=None,
+                 help="stop reading a list after this many rows")
+        self.opt('--fields', default=None,
+                 help="comma separated list of the fields to print")
+
+    def streaming(self):
+        """
+        True if the output format can be written as the records arrive,
+        commands should then pass display() an iterator such as stream()
+        """
+        return getattr(self, 'output_format', None) in WRITERS
+
+    def incremental(self):
+        """
+        True if display() reads only part of a listing or writes it as
+        it arrives, such that commands should pass it a stream()
+        """
+        return self.streaming() or getattr(self, 'max_rows', None) \
+            is not None
+
+    def note(self, message):
+        """
+        Print 'message' for a person, but not into machine readable output
+        """
+        if not self.streaming():
+            print(message)
+
     def display(self, results, headers=None):
+        try:
+            self._display_all(results, headers)
+        finally:
+            # Release the connection of a stream we stopped reading
+            if hasattr(results, 'close'):
+                results.close()
+
+    def _display_all(self, results, headers=None):
+        fields = getattr(self, 'fields', None)
+        if fields:
+            headers = [field.strip() for field in fields.split(',')]
+            results = self._project(results, headers)
+        max_rows = getattr(self, 'max_rows', None)
+        if self.streaming():
+            if max_rows is not None and not isinstance(results, MAPPINGS):
+                # Stops reading a streamed response early
+                results = islice(results, max_rows)
+            WRITERS[self.output_format](sys.stdout, results, headers)
+            return
+        code = getattr(results, 'get_code', lambda: 200)()
+        more = False
+        if max_rows is not None and not isinstance(results, MAPPINGS):
+            # Read one row past the limit to learn if any were left out
+            rows = list(islice(results, max_rows + 1))
+            more = len(rows) > max_rows
+            results = rows[:max_rows]
+        elif not isinstance(results, (list,) + MAPPINGS):
+            results = list(results)
         self._display(results, headers)
+        if more:
+            print("-- Only the first %d rows shown --" % max_rows)
         # If the response is not 200, show the user
-        if results.get_code() != 200:
-            print("\n-- HTTP Code: %s --" % results.get_code())
+        if code != 200:
+            print("\n-- HTTP Code: %s --" % code)
+
+    def _project(self, results, fields):
+        code = getattr(results, 'get_code', lambda: 200)()
+        if isinstance(results, MAPPINGS):
+            return response(project(results, fields), code)
+        if isinstance(results, list):
+            return response([project(record, fields) for record in results],
+                            code)
+        return (project(record, fields) for record in results)
 
     def _display(self, results, headers=None):
         # No results?
@@ -42,26 +232,10 @@ class Displayable(object):
         # Assume this is a list of items and build a table
         # Get the headers from the first row in the result
         if not headers:
-            headers = results[0].keys()
+            headers = list(results[0].keys())
 
-        table = PrettyTable(headers)
-
-        # Iterate through the rows
-        for row in results:
-            # Extract the correct columns for each row
-            table.add_row(self._build_row(row, headers))
-
-        # Print the table
-        print(table)
-
-    def _build_row(self, row, headers):
-        result = []
-        for key in headers:
-            if key in row:
-                result.append(row[key])
-            else:
-                result.append('')
-        return result
+        write_table(sys.stdout, results, headers,
+                    getattr(self, 'max_width', None))
 
     def _filter(self, dict, keep):
         """ Remove any keys not in 'keep' """
@@ -69,7 +243,7 @@ class Displayable(object):
             return dict
 
         result = {}
-        for key, value in dict.iteritems():
+        for key, value in dict.items():
             if key in keep:
                 result[key] = value
         return result
@@ -81,28 +255,35 @@ class Displayable(object):
                 longest = len(item)
         return longest
 
-    def _item(self, value, offset):
-        return "%s%s" % (' ' * offset, self._format(value, offset))
-
-    def _pair(self, key, value, offset):
-        return ('%' + str(offset) + 's: %s') % (key, self._format(value,
-                                                                  offset))
-
     def format(self, *args, **kwargs):
         return self._format(*args, **kwargs)[2:-4]
 
     def _format(self, value, offset=0):
+        parts = []
+        self._format_into(parts, value, offset)
+        return ''.join(parts)
+
+    def _format_into(self, parts, value, offset):
+        """ Append the pieces of the formatted 'value' to 'parts' """
         if isinstance(value, list):
-            result = [self._item(it, offset + 5)
-                      for it in value]
-            if len(result):
-                return "[\n%s\n%s]" % (',\n'.join(result), ' ' * (offset + 2))
-            return "[]"
-        if isinstance(value, dict):
-            align = self._longest_len(value)
-            result = [self._pair(key, _value, (offset + 4) + align)
-                      for key, _value in value.iteritems()]
-            if len(result):
-                return "{\n%s\n%s}" % ('\n'.join(result), ' ' * (offset + 2))
-            return "{}"
-        return "%s" % value
+            if not value:
+                parts.append("[]")
+                return
+            parts.append("[\n")
+            for i, item in enumerate(value):
+                parts.append("%s%s" % (',\n' if i else '', ' ' * (offset + 5)))
+                self._format_into(parts, item, offset + 5)
+            parts.append("\n%s]" % (' ' * (offset + 2)))
+            return
+        if isinstance(value, MAPPINGS):
+            if not value:
+                parts.append("{}")
+                return
+            width = (offset + 4) + self._longest_len(value)
+            parts.append("{\n")
+            for i, (key, item) in enumerate(value.items()):
+                parts.append("%s%*s: " % ('\n' if i else '', width, key))
+                self._format_into(parts, item, width)
+            parts.append("\n%s}" % (' ' * (offset + 2)))
+            return
+        parts.append("%s" % (value,))
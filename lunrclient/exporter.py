@@ -0,0 +1,259 @@
+# Copyright 2011-2016 Rackspace US, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from lunrclient.base import LunrError, log
+from lunrclient.batch import Batch, DEFAULT_CONCURRENCY
+from lunrclient.client import StorageClient
+from lunrclient.lunr import storage_url
+from lunrclient.transport import registry
+from collections import OrderedDict
+from threading import Thread, Event, Lock
+import numbers
+import time
+
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+GB = 1024 ** 3
+
+
+def escape(value):
+    return str(value).replace('\\', r'\\').replace('\n', r'\n')\
+        .replace('"', r'\"')
+
+
+class Gauges(object):
+    """
+    A set of gauges rendered in the prometheus text format
+    """
+
+    def __init__(self):
+        self.help = OrderedDict()
+        self.values = {}
+
+    def describe(self, name, help):
+        self.help[name] = help
+        self.values[name] = OrderedDict()
+
+    def set(self, name, value, **labels):
+        self.values[name][tuple(sorted(labels.items()))] = value
+
+    def inc(self, name, value=1, **labels):
+        key = tuple(sorted(labels.items()))
+        self.values[name][key] = self.values[name].get(key, 0) + value
+
+    def render(self):
+        lines = []
+        for name, help in self.help.items():
+            lines.append('# HELP %s %s' % (name, help))
+            lines.append('# TYPE %s gauge' % name)
+            for labels, value in self.values[name].items():
+                if labels:
+                    pairs = ','.join('%s="%s"' % (key, escape(label))
+                                     for key, label in labels)
+                    lines.append('%s{%s} %s' % (name, pairs, value))
+                else:
+                    lines.append('%s %s' % (name, value))
+        return '\n'.join(lines) + '\n'
+
+
+class FleetCollector(object):
+    """
+    Gathers the state of the fleet with one sweep: the node, volume and
+    backup listings from the api, plus the status and volume listing of
+    every storage node fetched concurrently
+
+    :param client: a LunrClient for the admin tenant
+    :param concurrency: the most requests in flight at once
+    :param timeout: the timeout for requests to each storage node
+    """
+
+    def __init__(self, client, concurrency=DEFAULT_CONCURRENCY,
+                 timeout=10):
+        self.client = client
+        self.concurrency = concurrency
+        self.timeout = timeout
+
+    def storage_client(self, node):
+        url = storage_url(node)
+        return StorageClient(url, timeout=self.timeout,
+                             hooks=self.client.hooks,
+                             transport=registry.get(url))
+
+    def fetch(self, nodes):
+        """
+        Return the api volumes, api backups and a (status, volumes)
+        BatchResult pair for each node
+        """
+        batch = Batch(concurrency=self.concurrency, per_host=2)
+        batch.submit(self.client.volumes.list)
+        batch.submit(self.client.backups.list)
+        for node in nodes:
+            storage = self.storage_client(node)
+            batch.submit(storage.status.list)
+            batch.submit(storage.volumes.list)
+        results = sorted(batch.run(), key=lambda result: result.index)
+        for result in results[:2]:
+            if result.error:
+                raise result.error
+        pairs = [results[i:i + 2] for i in range(2, len(results), 2)]
+        return results[0].result, results[1].result, pairs
+
+    def collect(self):
+        """
+        Return the Gauges describing the fleet
+        """
+        start = time.time()
+        nodes = self.client.nodes.list()
+        volumes, backups, pairs = self.fetch(nodes)
+
+        gauges = Gauges()
+        self.add_nodes(gauges, nodes, pairs)
+        self.add_volumes(gauges, volumes)
+        self.add_backups(gauges, backups)
+        gauges.describe('lunr_scrape_duration_seconds',
+                        "Seconds taken to sweep the fleet")
+        gauges.set('lunr_scrape_duration_seconds', time.time() - start)
+        return gauges
+
+    def add_nodes(self, gauges, nodes, pairs):
+        gauges.describe('lunr_node_up', "1 if the storage node responded")
+        gauges.describe('lunr_node_size_gigabytes',
+                        "Capacity of the node reported by the api")
+        gauges.describe('lunr_node_volumes',
+                        "Volumes found on the storage node")
+        gauges.describe('lunr_node_volumes_gigabytes',
+                        "Size of the volumes found on the storage node")
+        gauges.describe('lunr_node_status',
+                        "Numeric values reported by the storage node status")
+        for node, (status, volumes) in zip(nodes, pairs):
+            labels = {'node': node['name'], 'status': node['status'],
+                      'volume_type': node['volume_type_name']}
+            up = not (status.error or volumes.error)
+            gauges.set('lunr_node_up', int(up), **labels)
+            gauges.set('lunr_node_size_gigabytes', node['size'], **labels)
+            if not up:
+                continue
+            size = sum(int(volume['size']) for volume in volumes.result)
+            gauges.set('lunr_node_volumes', len(volumes.result), **labels)
+            gauges.set('lunr_node_volumes_gigabytes', size / float(GB),
+                       **labels)
+            for key, value in sorted(status.result.items()):
+                if isinstance(value, numbers.Number) \
+                        and not isinstance(value, bool):
+                    gauges.set('lunr_node_status', value,
+                               node=node['name'], key=key)
+
+    def add_volumes(self, gauges, volumes):
+        gauges.describe('lunr_volumes', "Volumes known to the api")
+        gauges.describe('lunr_volumes_gigabytes',
+                        "Size of the volumes known to the api")
+        for volume in volumes:
+            labels = {'status': volume['status'],
+                      'volume_type': volume['volume_type_name']}
+            gauges.inc('lunr_volumes', **labels)
+            gauges.inc('lunr_volumes_gigabytes', volume['size'], **labels)
+
+    def add_backups(self, gauges, backups):
+        gauges.describe('lunr_backups', "Backups known to the api")
+        for backup in backups:
+            gauges.inc('lunr_backups', status=backup['status'])
+
+
+class Exporter(object):
+    """
+    Sweeps the fleet every 'interval' seconds in a background thread and
+    serves the last result, such that scrapes never call the api
+    """
+
+    def __init__(self, collector, interval=60):
+        self.collector = collector
+        self.interval = interval
+        self.text = ''
+        self.errors = 0
+        self.lock = Lock()
+        self.stopped = Event()
+        self.thread = None
+
+    def update(self):
+        try:
+            text = self.collector.collect().render()
+        except Exception as e:
+            # Keep serving the previous sweep, an unexpected error must
+            # not end the thread either
+            if isinstance(e, LunrError):
+                log.warning("fleet sweep failed: %s", e)
+            else:
+                log.exception("fleet sweep failed")
+            with self.lock:
+                self.errors += 1
+            return
+        with self.lock:
+            self.text = text
+
+    def metrics(self):
+        with self.lock:
+            return self.text + (
+                "# HELP lunr_scrape_errors_total Failed sweeps\n"
+                "# TYPE lunr_scrape_errors_total counter\n"
+                "lunr_scrape_errors_total %d\n" % self.errors)
+
+    def run(self):
+        while not self.stopped.is_set():
+            self.update()
+            self.stopped.wait(self.interval)
+
+    def start(self):
+        self.thread = Thread(target=self.run, name='lunr-exporter')
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+
+    def server(self, host='', port=9490):
+        """
+        Return an http server that answers GET /metrics
+        """
+        from six.moves.BaseHTTPServer import HTTPServer, \
+            BaseHTTPRequestHandler
+        from six.moves.socketserver import ThreadingMixIn
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    return self.send_error(404)
+                body = exporter.metrics().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', CONTENT_TYPE)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                log.debug(format, *args)
+
+        class Server(ThreadingMixIn, HTTPServer):
+            daemon_threads = True
+
+        return Server((host, port), Handler)
+
+    def serve(self, host='', port=9490):
+        self.start()
+        server = self.server(host, port)
+        try:
+            server.serve_forever()
+        finally:
+            self.stop()
+            server.server_close()
@@ -0,0 +1,201 @@
+# Copyright 2011-2016 Rackspace US, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from lunrclient.base import LunrError, LunrHttpError
+from lunrclient.batch import Batch, DEFAULT_CONCURRENCY
+from lunrclient.client import StorageClient
+from lunrclient.lunr import storage_url
+from lunrclient.transport import registry
+from six.moves.queue import Queue
+from collections import namedtuple
+from threading import Event, Thread
+
+
+GB = 1024 ** 3
+# Api volumes in these states are not expected on the storage node
+NOT_ON_STORAGE = ('NEW', 'BUILDING', 'DELETING', 'DELETED')
+
+# 'problem' is one of 'orphan' (on the storage node but not in the api),
+# 'missing' (in the api but not on the storage node), 'size' or 'error'
+Finding = namedtuple('Finding', ['node', 'volume_id', 'problem',
+                                 'api_size', 'storage_size', 'detail'])
+
+# Put on the queue by Fleet.exports() once the batch of visits ends
+FINISHED = object()
+
+# 'state' is one of 'connected', 'no-session', 'not-exported' or 'error',
+# 'sessions' the ips of the connected initiators
+ExportState = namedtuple('ExportState', ['node', 'volume_id', 'state',
+                                         'sessions', 'iqn', 'detail'])
+
+
+def export_state(node, volume_id, result):
+    """
+    Describe the export of 'volume_id' given the BatchResult of
+    StorageExport.get()
+    """
+    error = result.error
+    if isinstance(error, LunrHttpError) and error.code == 404:
+        return ExportState(node['name'], volume_id, 'not-exported', '',
+                           None, None)
+    if error:
+        return ExportState(node['name'], volume_id, 'error', '', None,
+                           str(error))
+    ips = [session.get('ip', '') for session in
+           result.result.get('sessions') or []]
+    return ExportState(node['name'], volume_id,
+                       'connected' if ips else 'no-session', ','.join(ips),
+                       result.result.get('name'), None)
+
+
+class Fleet(object):
+    """
+    Operations that visit every storage node, concurrently and with a
+    timeout for each node. Results are yielded as each node answers
+
+    :param client: a LunrClient for the admin tenant
+    :param concurrency: the most nodes visited at once
+    :param timeout: the timeout for requests to each storage node
+    """
+
+    def __init__(self, client, concurrency=DEFAULT_CONCURRENCY, timeout=30):
+        self.client = client
+        self.concurrency = concurrency
+        self.timeout = timeout
+
+    def storage_client(self, node):
+        url = storage_url(node)
+        return StorageClient(url, debug=self.client.debug,
+                             timeout=self.timeout, hooks=self.client.hooks,
+                             transport=registry.get(url))
+
+    def nodes(self, status='ACTIVE'):
+        return [node for node in self.client.directory.all()
+                if status is None or node['status'] == status]
+
+    def reconcile(self, nodes=None):
+        """
+        Compare the volumes the api places on each node with the volumes
+        the node has, yielding a Finding for each difference. Only one
+        node's volumes are held in memory per concurrent visit
+        """
+        batch = Batch(concurrency=self.concurrency)
+        for node in nodes if nodes is not None else self.nodes():
+            batch.submit(self.reconcile_node, node)
+        for result in batch.run():
+            if result.error:
+                yield Finding(result.args[0]['name'], None, 'error', None,
+                              None, str(result.error))
+                continue
+            for finding in result.result:
+                yield finding
+
+    def reconcile_node(self, node):
+        # Hash both sides by id, then one pass over each finds the changes
+        storage = dict((volume['id'], volume) for volume in
+                       self.storage_client(node).volumes.list())
+        api = dict((volume['id'], volume) for volume in
+                   self.client.volumes.list(node_id=node['id'])
+                   if volume['status'] != 'DELETED')
+        findings = []
+        for volume_id, volume in storage.items():
+            # Backup snapshots belong to their origin volume
+            if volume.get('origin'):
+                continue
+            expected = api.get(volume_id)
+            if expected is None:
+                findings.append(Finding(node['name'], volume_id, 'orphan',
+                                        None, int(volume['size']), None))
+            elif int(expected['size']) * GB != int(volume['size']):
+                findings.append(Finding(node['name'], volume_id, 'size',
+                                        int(expected['size']) * GB,
+                                        int(volume['size']), None))
+        for volume_id, volume in api.items():
+            if volume_id not in storage \
+                    and volume['status'] not in NOT_ON_STORAGE:
+                findings.append(Finding(node['name'], volume_id, 'missing',
+                                        int(volume['size']) * GB, None,
+                                        volume['status']))
+        return findings
+
+    def exports(self, nodes=None, per_host=4):
+        """
+        Yield the ExportState of every volume on the storage nodes as
+        soon as it is known. Nodes are visited concurrently, with at
+        most 'per_host' requests in flight to each node
+        """
+        nodes = list(nodes if nodes is not None else self.nodes())
+        states, errors, stop = Queue(), [], Event()
+        batch = Batch(concurrency=self.concurrency)
+        for node in nodes:
+            batch.submit(self.visit_exports, node, per_host, states, stop)
+        thread = Thread(target=self.run_visits, args=(batch, states, errors))
+        thread.daemon = True
+        thread.start()
+
+        remaining = len(nodes)
+        try:
+            while remaining:
+                state = states.get()
+                if state is FINISHED:
+                    # The visits still queued will never report
+                    raise errors[0] if errors else \
+                        LunrError("export sweep ended with %d nodes "
+                                  "unvisited" % remaining)
+                if state is None:
+                    remaining -= 1
+                    continue
+                yield state
+        finally:
+            # Nobody reads the rest if the consumer stopped early
+            stop.set()
+
+    def visit_exports(self, node, per_host, states, stop):
+        try:
+            if stop.is_set():
+                return
+            for state in self.node_exports(node, per_host, stop):
+                states.put(state)
+        except Exception as e:
+            states.put(ExportState(node['name'], None, 'error', '', None,
+                                   str(e)))
+        finally:
+            # Tell the consumer this node is done
+            states.put(None)
+
+    def run_visits(self, batch, states, errors):
+        try:
+            for result in batch.run():
+                pass
+        except Exception as e:
+            errors.append(e)
+        finally:
+            # Every visit has reported, unless run() failed
+            states.put(FINISHED)
+
+    def node_exports(self, node, per_host, stop):
+        storage = self.storage_client(node)
+        batch = Batch(concurrency=per_host)
+        for volume in storage.volumes.list():
+            if not volume.get('origin'):
+                batch.submit(storage.exports.get, volume['id'])
+        results = batch.run()
+        try:
+            for result in results:
+                if stop.is_set():
+                    break
+                yield export_state(node, result.args[0], result)
+        finally:
+            # Abandons the requests not yet made
+            results.close()
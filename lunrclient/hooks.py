@@ -0,0 +1,177 @@
+# Copyright 2011-2016 Rackspace US, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from six.moves.urllib.parse import urlparse
+from threading import Lock
+import time
+
+
+# Path segments that are followed by an id
+COLLECTIONS = ('volumes', 'backups', 'accounts', 'nodes')
+# Upper bounds of the latency histogram buckets in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+           float('inf'))
+
+
+def url_template(path):
+    """
+    Replace the ids in a url path with placeholders, such that
+    '/volumes/vol-1/backups' becomes '/volumes/{id}/backups'
+    """
+    parts = path.split('/')
+    for i in range(1, len(parts)):
+        if parts[i - 1] in COLLECTIONS:
+            parts[i] = '{id}'
+        elif parts[i - 1] == 'v1.0':
+            parts[i] = '{tenant_id}'
+    return '/'.join(parts)
+
+
+class RequestEvent(object):
+    """
+    Describes a single attempt at an http request. Latencies are in
+    seconds; 'ttfb' is the time until the response headers were parsed.
+    requests does not report dns or connect time separately, they are
+    included in 'ttfb'
+    """
+
+    def __init__(self, method, url, attempt):
+        parts = urlparse(url)
+        self.method = method
+        self.url = url
+        self.host = parts.netloc
+        self.template = url_template(parts.path)
+        # The number of retries before this attempt
+        self.attempt = attempt
+        self.status = None
+        self.bytes = None
+        self.ttfb = None
+        self.total = None
+        self.error = None
+        self.start = time.time()
+
+    def received(self, resp, stream=False):
+        """
+        Note the response; 'bytes' is the length of the body as read,
+        or for a stream (whose body is not read yet) the Content-Length
+        if the server sent one
+        """
+        self.status = resp.status_code
+        self.ttfb = resp.elapsed.total_seconds()
+        if not stream:
+            # Chunked and compressed responses have no Content-Length
+            self.bytes = len(resp.content)
+            return
+        length = resp.headers.get('Content-Length')
+        self.bytes = int(length) if length else None
+
+    def finish(self, error=None):
+        self.total = time.time() - self.start
+        self.error = error
+
+
+class Hooks(object):
+    """
+    Base class for request observers given to a client with
+    hooks=[...]; override the methods of interest
+    """
+
+    def pre_request(self, event):
+        pass
+
+    def post_response(self, event):
+        pass
+
+    def on_error(self, event):
+        pass
+
+
+class Histogram(object):
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.bytes = 0
+
+    def add(self, event):
+        self.count += 1
+        self.total += event.total
+        self.max = max(self.max, event.total)
+        self.bytes += event.bytes or 0
+        if event.error:
+            self.errors += 1
+        for i, bound in enumerate(BUCKETS):
+            if event.total <= bound:
+                self.counts[i] += 1
+                break
+
+    def percentile(self, percent):
+        """
+        Return the upper bound of the bucket the percentile falls in
+        """
+        target = self.count * percent / 100.0
+        seen = 0
+        for bound, count in zip(BUCKETS, self.counts):
+            seen += count
+            if seen >= target:
+                return min(bound, self.max)
+        return self.max
+
+
+class TimingCollector(Hooks):
+    """
+    Collects a latency histogram per method, host and url template
+
+        timings = TimingCollector()
+        client = StorageClient(url, hooks=[timings])
+        ...
+        for row in timings.summary():
+            print(row)
+    """
+
+    def __init__(self):
+        self.histograms = {}
+        self.lock = Lock()
+
+    def record(self, event):
+        key = (event.method, event.host, event.template)
+        with self.lock:
+            if key not in self.histograms:
+                self.histograms[key] = Histogram()
+            self.histograms[key].add(event)
+
+    post_response = on_error = record
+
+    def summary(self):
+        """
+        Return a row per endpoint, the slowest (by total time) first
+        """
+        rows = []
+        with self.lock:
+            for (method, host, template), hist in self.histograms.items():
+                rows.append({
+                    'method': method, 'host': host, 'template': template,
+                    'count': hist.count, 'errors': hist.errors,
+                    'bytes': hist.bytes, 'total': hist.total,
+                    'mean': hist.total / hist.count, 'max': hist.max,
+                    'p50': hist.percentile(50), 'p95': hist.percentile(95),
+                    'p99': hist.percentile(99)})
+        return sorted(rows, key=lambda row: row['total'], reverse=True)
+
+    def reset(self):
+        with self.lock:
+            self.histograms = {}
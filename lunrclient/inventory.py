@@ -0,0 +1,256 @@
+# Copyright 2011-2016 Rackspace US, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from lunrclient.base import LunrError, LunrHttpError
+from lunrclient.batch import Batch, DEFAULT_CONCURRENCY
+from lunrclient.cache import cache_dir
+from lunrclient.records import plain
+from collections import OrderedDict
+from os.path import join, expanduser, dirname
+import json
+import time
+import os
+
+
+# The columns of each table, every table also has the 'data' column
+# which holds the complete record as json
+TABLES = OrderedDict([
+    ('nodes', ('id', 'name', 'status', 'volume_type_name', 'hostname',
+               'port', 'storage_hostname', 'size', 'created_at',
+               'last_modified')),
+    ('accounts', ('id', 'name', 'status', 'created_at', 'last_modified')),
+    ('volumes', ('id', 'account_id', 'node_id', 'status', 'size',
+                 'volume_type_name', 'restore_of', 'created_at',
+                 'last_modified')),
+    ('backups', ('id', 'account_id', 'volume_id', 'status', 'size',
+                 'created_at', 'last_modified')),
+    ('exports', ('id', 'status', 'instance_id', 'mountpoint', 'ip',
+                 'initiator', 'session_ip', 'session_initiator',
+                 'target_name', 'created_at', 'last_modified')),
+])
+
+# Exports change without changing their volume, so the export of every
+# volume is fetched again once it was checked this many seconds ago
+EXPORT_MAX_AGE = 3600
+
+INDEXES = {
+    'nodes': ('status', 'volume_type_name'),
+    'volumes': ('account_id', 'node_id', 'status', 'volume_type_name'),
+    'backups': ('account_id', 'volume_id', 'status'),
+    'exports': ('status',),
+}
+
+
+def default_path():
+    return os.environ.get('LUNR_INVENTORY') \
+        or join(cache_dir(), 'inventory.sqlite')
+
+
+class Inventory(object):
+    """
+    A local sqlite snapshot of the nodes, accounts, volumes, backups and
+    (optionally) exports, for answering questions without the api
+
+        inventory = Inventory()
+        inventory.sync(LunrClient('admin'))
+        inventory.query("SELECT id FROM volumes WHERE size > ?", (500,))
+    """
+
+    def __init__(self, path=None):
+        self.path = expanduser(path or default_path())
+
+    def connect(self, readonly=False):
+        # Imported here to keep the command line quick to start
+        import sqlite3
+        if not readonly and not os.path.isdir(dirname(self.path) or '.'):
+            os.makedirs(dirname(self.path), 0o700)
+        db = sqlite3.connect(self.path)
+        db.row_factory = sqlite3.Row
+        if readonly:
+            db.execute('PRAGMA query_only = ON')
+        return db
+
+    def create(self, db):
+        for table, columns in TABLES.items():
+            db.execute('CREATE TABLE IF NOT EXISTS %s (id TEXT PRIMARY KEY, '
+                       '%s, data TEXT)' % (table, ', '.join(columns[1:])))
+            for column in INDEXES.get(table, ()):
+                db.execute('CREATE INDEX IF NOT EXISTS %s_%s ON %s (%s)'
+                           % (table, column, table, column))
+        db.execute('CREATE TABLE IF NOT EXISTS syncs (name TEXT PRIMARY KEY,'
+                   ' synced_at REAL, total INTEGER, changed INTEGER,'
+                   ' deleted INTEGER)')
+        # When the export of each volume was last fetched
+        db.execute('CREATE TABLE IF NOT EXISTS export_checks '
+                   '(id TEXT PRIMARY KEY, checked_at REAL)')
+
+    def fetch(self, client):
+        """
+        Request the node and account listings concurrently, the volumes
+        and backups are streamed later by sync() as each is merged
+        """
+        batch = Batch(concurrency=2)
+        batch.submit(client.nodes.list)
+        batch.submit(client.accounts.list)
+        results = sorted(batch.run(), key=lambda result: result.index)
+        for result in results:
+            if result.error:
+                raise result.error
+        return [result.result for result in results]
+
+    def upsert(self, db, table, row):
+        columns = TABLES[table]
+        values = [row.get(column) for column in columns]
+        values.append(json.dumps(row, default=plain))
+        db.execute('INSERT OR REPLACE INTO %s (%s, data) VALUES (%s)' % (
+            table, ', '.join(columns), ', '.join('?' * len(values))), values)
+
+    def merge(self, db, table, rows):
+        """
+        Write the rows whose last_modified changed and delete those no
+        longer listed. Return (total, ids of the changed rows, deleted)
+        """
+        select = 'SELECT last_modified FROM %s WHERE id = ?' % table
+        db.execute('CREATE TEMP TABLE IF NOT EXISTS seen '
+                   '(id TEXT PRIMARY KEY)')
+        db.execute('DELETE FROM seen')
+        total, changed = 0, []
+        for row in rows:
+            total += 1
+            db.execute('INSERT OR IGNORE INTO seen VALUES (?)', (row['id'],))
+            current = db.execute(select, (row['id'],)).fetchone()
+            if current and current[0] is not None \
+                    and current[0] == row.get('last_modified'):
+                continue
+            self.upsert(db, table, row)
+            changed.append(row['id'])
+        deleted = db.execute('DELETE FROM %s WHERE id NOT IN '
+                             '(SELECT id FROM seen)' % table).rowcount
+        return total, changed, deleted
+
+    def update(self, db, table, rows, stats):
+        """
+        Merge 'rows' into 'table', adding its counts to 'stats'. Return
+        the ids of the changed rows
+        """
+        total, changed, deleted = self.merge(db, table, rows)
+        self.record(db, table, total, len(changed), deleted)
+        stats[table] = (total, len(changed), deleted)
+        return changed
+
+    def update_stream(self, db, table, api, stats):
+        """
+        Same as update() with the rows streamed from 'api'
+        """
+        rows = api.stream()
+        try:
+            return self.update(db, table, rows, stats)
+        finally:
+            rows.close()
+
+    def record(self, db, name, total, changed, deleted):
+        db.execute('INSERT OR REPLACE INTO syncs VALUES (?, ?, ?, ?, ?)',
+                   (name, time.time(), total, changed, deleted))
+
+    def sync(self, client, exports=False, concurrency=DEFAULT_CONCURRENCY,
+             export_max_age=EXPORT_MAX_AGE):
+        """
+        Bring the snapshot up to date using 'client', a LunrClient for the
+        admin tenant. With 'exports' the export of every volume that
+        changed, or was last checked more than 'export_max_age' seconds
+        ago, is fetched too. Return {table: (total, changed, deleted)}
+        """
+        db = self.connect()
+        try:
+            self.create(db)
+            stats = OrderedDict()
+            for table, rows in zip(('nodes', 'accounts'), self.fetch(client)):
+                self.update(db, table, rows, stats)
+            # Each stream is only opened once the listing before it was
+            # merged, so a slow merge never leaves a response unread
+            volumes = self.update_stream(db, 'volumes', client.volumes, stats)
+            self.update_stream(db, 'backups', client.backups, stats)
+            if exports:
+                volumes = set(volumes) | self.stale_exports(db,
+                                                            export_max_age)
+                stats['exports'] = self.sync_exports(db, client, volumes,
+                                                     concurrency)
+            db.commit()
+            return stats
+        finally:
+            db.close()
+
+    def stale_exports(self, db, max_age):
+        """
+        Return the ids of the volumes whose export was never fetched or
+        was fetched more than 'max_age' seconds ago
+        """
+        cursor = db.execute("SELECT v.id FROM volumes v "
+                            "LEFT JOIN export_checks c ON c.id = v.id "
+                            "WHERE v.status != 'DELETED' AND "
+                            "(c.checked_at IS NULL OR c.checked_at < ?)",
+                            (time.time() - max_age,))
+        return set(row[0] for row in cursor)
+
+    def sync_exports(self, db, client, volume_ids, concurrency):
+        """
+        Fetch the exports of 'volume_ids' concurrently, a volume
+        without an export has its row removed
+        """
+        batch = Batch(concurrency=concurrency)
+        select = 'SELECT status FROM volumes WHERE id = ?'
+        for volume_id in volume_ids:
+            if db.execute(select, (volume_id,)).fetchone()[0] != 'DELETED':
+                batch.submit(client.exports.get, volume_id)
+        changed = deleted = 0
+        check = 'INSERT OR REPLACE INTO export_checks VALUES (?, ?)'
+        for result in batch.run():
+            volume_id = result.args[0]
+            if isinstance(result.error, LunrHttpError) \
+                    and result.error.code == 404:
+                deleted += db.execute('DELETE FROM exports WHERE id = ?',
+                                      (volume_id,)).rowcount
+                db.execute(check, (volume_id, time.time()))
+                continue
+            if result.error:
+                raise result.error
+            self.upsert(db, 'exports', dict(result.result, id=volume_id))
+            db.execute(check, (volume_id, time.time()))
+            changed += 1
+        # Drop the exports of volumes that no longer exist
+        deleted += db.execute('DELETE FROM exports WHERE id NOT IN '
+                              '(SELECT id FROM volumes)').rowcount
+        db.execute('DELETE FROM export_checks WHERE id NOT IN '
+                   '(SELECT id FROM volumes)')
+        total = db.execute('SELECT count(*) FROM exports').fetchone()[0]
+        self.record(db, 'exports', total, changed, deleted)
+        return total, changed, deleted
+
+    def query(self, sql, params=()):
+        """
+        Run a read only query, returning the column names and the rows
+        """
+        if not os.path.exists(self.path):
+            raise LunrError("no inventory at '%s', run 'lunr inventory sync'"
+                            % self.path)
+        import sqlite3
+        db = self.connect(readonly=True)
+        try:
+            cursor = db.execute(sql, params)
+            columns = [column[0] for column in cursor.description or ()]
+            return columns, [dict(zip(columns, row)) for row in cursor]
+        except sqlite3.Error as e:
+            raise LunrError("query failed: %s" % e)
+        finally:
+            db.close()
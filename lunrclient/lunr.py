@@ -12,7 +12,9 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from lunrclient.base import BaseAPI
+from lunrclient.base import BaseAPI, missing_as_none, has_status, response
+from lunrclient.pages import Pages
+from lunrclient import records
 import uuid
 
 
@@ -27,8 +29,74 @@ class LunrAPI(BaseAPI):
         return "%s/%s/%s%s" % (self.client.url, self.version,
                                self.client.tenant_id, uri)
 
+    def use_records(self):
+        return getattr(self.client, 'records', False)
 
-class LunrVolume(LunrAPI):
+    def get_list(self, uri, record, params):
+        """
+        GET a json list, as 'record' objects if the client asks for
+        records. Each is built as soon as it is decoded, so the listing
+        is never held as dicts all at once
+        """
+        if not self.use_records():
+            return self.http_get(uri, params=params)
+        with self.http_stream(uri, params=params) as items:
+            return response([record(item) for item in items], 200)
+
+    def get_stream(self, uri, record, params):
+        items = self.http_stream(uri, params=params)
+        if not self.use_records():
+            return items
+        return records.Stream(items, record)
+
+    def pages(self, limit=100, prefetch=False, **kwargs):
+        """
+        same as list() but returns an iterator that requests 'limit'
+        items at a time as they are needed, see pages.Pages
+        """
+        return Pages(self.list, limit, prefetch, **kwargs)
+
+
+class LunrWaiter(object):
+    """
+    Wait helpers for resources that have a 'status', the keyword
+    arguments are passed to BaseAPI.poll() (timeout, interval, etc..)
+    """
+
+    def wait_for_status(self, id, status, **kwargs):
+        """
+        wait until the resource has one of 'status' (or the
+        predicate 'status' is true) and return the resource
+        """
+        return self.poll(lambda: self.get(id), has_status(status), **kwargs)
+
+    def wait_for_delete(self, id, **kwargs):
+        """
+        wait until the resource is DELETED or no longer exists
+        """
+        deleted = has_status('DELETED')
+        return self.poll(lambda: missing_as_none(self.get, id),
+                         lambda r: r is None or deleted(r), **kwargs)
+
+    def wait_for_all(self, ids, status, filters=None, **kwargs):
+        """
+        wait until all the resources in 'ids' have one of 'status',
+        polls with a single list() call (narrowed by 'filters') instead
+        of a get() per resource. Returns a dict of id to resource
+        """
+        ids = set(ids)
+        until = has_status(status)
+
+        def fetch():
+            return dict((item['id'], item)
+                        for item in self.list(**(filters or {}))
+                        if item['id'] in ids)
+
+        return self.poll(fetch, lambda found: all(
+            until(found.get(id)) for id in ids), **kwargs)
+
+
+class LunrVolume(LunrAPI, LunrWaiter):
 
     def list(self, **kwargs):
         """
@@ -36,7 +104,14 @@ class LunrVolume(LunrAPI):
         You can filter the results returned by the api with
         these parameters ['status', 'account_id', 'node_id', 'id']
         """
-        return self.http_get('/volumes', params=kwargs)
+        return self.get_list('/volumes', records.Volume, kwargs)
+
+    def stream(self, **kwargs):
+        """
+        same as list() but returns a generator that yields
+        each volume as soon as it is received
+        """
+        return self.get_stream('/volumes', records.Volume, kwargs)
 
     def get(self, volume_id):
         """
@@ -83,7 +158,7 @@ class LunrVolume(LunrAPI):
                               params={'status': status})
 
 
-class LunrBackup(LunrAPI):
+class LunrBackup(LunrAPI, LunrWaiter):
 
     def list(self, **kwargs):
         """
@@ -91,7 +166,14 @@ class LunrBackup(LunrAPI):
 
         filters: status, account_id, id, volume_id
         """
-        return self.http_get('/backups', params=kwargs)
+        return self.get_list('/backups', records.Backup, kwargs)
+
+    def stream(self, **kwargs):
+        """
+        same as list() but returns a generator that yields
+        each backup as soon as it is received
+        """
+        return self.get_stream('/backups', records.Backup, kwargs)
 
     def get(self, backup_id):
         """
@@ -129,7 +211,14 @@ class LunrAccount(LunrAPI):
 
         filters: status, id
         """
-        return self.http_get('/accounts', params=kwargs)
+        return self.get_list('/accounts', records.Account, kwargs)
+
+    def stream(self, **kwargs):
+        """
+        same as list() but returns a generator that yields
+        each account as soon as it is received
+        """
+        return self.get_stream('/accounts', records.Account, kwargs)
 
     def get(self, account_id):
         """
@@ -151,6 +240,13 @@ class LunrAccount(LunrAPI):
         return self.http_delete('/accounts/%s' % account_id)
 
 
+def storage_url(node):
+    """
+    Return the url of the storage api running on 'node'
+    """
+    return "http://%s:%s" % (node['hostname'], node['port'])
+
+
 class LunrNode(LunrAPI):
 
     def list(self, **kwargs):
@@ -159,7 +255,14 @@ class LunrNode(LunrAPI):
 
         filters: name, status, volume_type_name
         """
-        return self.http_get('/nodes', params=kwargs)
+        return self.get_list('/nodes', records.Node, kwargs)
+
+    def stream(self, **kwargs):
+        """
+        same as list() but returns a generator that yields
+        each node as soon as it is received
+        """
+        return self.get_stream('/nodes', records.Node, kwargs)
 
     def get(self, node_id):
         """
@@ -201,7 +304,10 @@ class LunrExport(LunrAPI):
         """
         get the details of an export
         """
-        return self.http_get('/volumes/%s/export' % volume_id)
+        result = self.http_get('/volumes/%s/export' % volume_id)
+        if not self.use_records():
+            return result
+        return records.response(records.Export, result, result.get_code())
 
     def create(self, volume_id, ip, initiator):
         """
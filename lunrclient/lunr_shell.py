@@ -16,13 +16,34 @@ from __future__ import print_function
 
 from lunrclient.base import LunrHttpError, LunrError, response
 from lunrclient.subcommand import SubCommand, SubCommandParser, opt, noargs
+from lunrclient.subcommand import LazySubCommand, SubCommandError
 from lunrclient.client import LunrClient, StorageClient, Auth
-from lunrclient.displayable import Displayable
+from lunrclient.displayable import Displayable, DISPLAY_OPTIONS, project
+from lunrclient.lunr import storage_url
 from lunrclient.shared import Env, ShellError
+from lunrclient.transport import registry
+from lunrclient.cache import TokenCache, ResponseCache, READ_MOSTLY
+from lunrclient.cache import cache_dir
+from lunrclient.completion import index_path
 import uuid
 import os
 
 
+def matcher(where):
+    """
+    Return a predicate true for the items that have every key and
+    value in 'where'
+    """
+    pairs = tuple(where.items())
+
+    def match(item):
+        for key, value in pairs:
+            if item.get(key) != value:
+                return False
+        return True
+    return match
+
+
 class LunrCommand(SubCommand, Displayable):
 
     def __init__(self):
@@ -31,6 +52,22 @@ class LunrCommand(SubCommand, Displayable):
         # Add debug option to all commands (creates self.debug)
         self.opt('-d', '--debug', action='store_const',
                  const=True, default=False, help="print the REST calls used")
+        self.display_options()
+
+    def remove(self, haystack, needles):
+        # The global options are never api parameters
+        return SubCommand.remove(self, haystack,
+                                 list(needles) + list(DISPLAY_OPTIONS))
+
+    def listing(self, api, **filters):
+        """
+        Return api.list(), or the api.stream() generator when the
+        output format can be written as the records arrive or when
+        --max-rows stops reading early
+        """
+        if self.incremental():
+            return api.stream(**filters)
+        return api.list(**filters)
 
     def get_admin(self, required=True):
         result = self.admin or os.environ.get('LUNR_ADMIN')
@@ -39,12 +76,15 @@ class LunrCommand(SubCommand, Displayable):
         return result
 
     def filter(self, haystack, where):
-        result = []
-        for item in haystack:
-            for key, value in where.items():
-                if item[key] == value:
-                    result.append(item)
-        return response(result, haystack.get_code())
+        """
+        Return the items of 'haystack' that match every key in 'where'.
+        A list gives a response, other iterables are filtered lazily
+        """
+        match = matcher(where)
+        if isinstance(haystack, list):
+            return response([item for item in haystack if match(item)],
+                            getattr(haystack, 'get_code', lambda: 200)())
+        return (item for item in haystack if match(item))
 
     def to_map(self, list, key):
         map = {}
@@ -87,11 +127,40 @@ class LunrCommand(SubCommand, Displayable):
             return payload.get('name', '(not exported)')
         return '(not exported)'
 
+    def storage_client_factory(self, url):
+        # Re-use any warm connections to this storage node
+        return StorageClient(url, debug=self.debug,
+                             transport=registry.get(url))
+
+    def token_cache(self):
+        # An empty LUNR_AUTH_CACHE disables the cache
+        path = os.environ.get('LUNR_AUTH_CACHE')
+        if path == '':
+            return None
+        return TokenCache(path)
+
+    def response_cache(self):
+        # LUNR_CACHE_TTL caches node and account lookups for that long
+        ttl = os.environ.get('LUNR_CACHE_TTL')
+        if not ttl:
+            return None
+        try:
+            ttls = dict.fromkeys(READ_MOSTLY, int(ttl))
+        except ValueError:
+            raise ShellError(self, "LUNR_CACHE_TTL must be in seconds")
+        return ResponseCache(ttls=ttls,
+                             path=os.path.join(cache_dir(), 'responses'))
+
+    def admin_client(self):
+        return LunrClient(self.get_admin(), debug=self.debug,
+                          response_cache=self.response_cache())
+
     def lunr_client_factory(self, tenant_id=None):
         tenant_id = tenant_id or os.environ.get('LUNR_TENANT_ID')
         # If DDI defined
         if tenant_id:
-            return LunrClient(tenant_id, debug=self.debug)
+            return LunrClient(tenant_id, debug=self.debug,
+                              response_cache=self.response_cache())
 
         if self.debug:
             print("-- LUNR_TENANT_ID not set, attempting to contact"
@@ -104,8 +173,10 @@ class LunrCommand(SubCommand, Displayable):
 
         auth = Auth(auth_url=env['OS_AUTH_URL'],
                     tenant_name=env['OS_TENANT_NAME'],
-                    user=env['OS_USERNAME'], password=env['OS_PASSWORD'])
-        return LunrClient(auth.fetch_tenant_id(), debug=self.debug)
+                    user=env['OS_USERNAME'], password=env['OS_PASSWORD'],
+                    cache=self.token_cache())
+        return LunrClient(auth.fetch_tenant_id(), debug=self.debug,
+                          response_cache=self.response_cache())
 
 
 class Volume(LunrCommand):
@@ -136,21 +207,30 @@ class Volume(LunrCommand):
     def list(self, args):
         filters = self.remove(args, ['debug', 'tenant_id',
                                      'admin', 'no_nodes'])
-        volumes = self.client.volumes.list(**filters)
+        volumes = self.listing(self.client.volumes, **filters)
         if args['no_nodes']:
             return self.display(volumes)
 
         headers = ['id', 'node-name', 'volume_type_name', 'restore_of',
                    'status', 'size']
         # Create a new client with ADMIN as the DDI to query the nodes
-        client = LunrClient(self.get_admin(), debug=self.debug)
-        nodes = self.to_map(client.nodes.list(), 'id')
-        # Add the node name to the volume results
-        for volume in volumes:
-            volume['node-name'] = nodes[volume['node_id']]['name']
+        directory = self.admin_client().directory
 
-        self.display(volumes, headers)
-        print("\nThis is a summary, use --no-nodes to see the entire response")
+        def with_node_name(volume):
+            node = directory.get(volume['node_id'])
+            volume['node-name'] = node['name'] if node else '(unknown)'
+            # Keep only the columns shown
+            return volume if self.fields else project(volume, headers)
+
+        # Add the node name to the volume results as they arrive
+        try:
+            self.display((with_node_name(volume) for volume in volumes),
+                         headers)
+        finally:
+            if hasattr(volumes, 'close'):
+                volumes.close()
+        self.note("\nThis is a summary, use --no-nodes to see the entire "
+                  "response")
 
     @opt('-n', '--no-summary', action='store_true',
          help="show only the response")
@@ -162,27 +242,28 @@ class Volume(LunrCommand):
             return self.display(volume)
 
         # Get the Node Information
-        client = LunrClient(self.get_admin(), debug=self.debug)
-        node = client.nodes.get(volume['node_id'])
-        volume['node-url'] = "http://%s:%s" % (node['hostname'], node['port'])
+        directory = self.admin_client().directory
+        node = directory.get(volume['node_id'])
+        if node is None:
+            raise LunrError("node '%s' of volume '%s' not found"
+                            % (volume['node_id'], id))
+        volume['node-url'] = storage_url(node)
         try:
             # Get the export information from the storage node
-            payload = StorageClient(volume['node-url'], debug=self.debug)\
-                .exports.get(id)
+            payload = directory.storage_client(node['id']).exports.get(id)
         except LunrHttpError as e:
             payload = {}
             if e.code != 404:
                 raise
 
-        volume['node-url'] = "http://%s:%s" % (node['hostname'], node['port'])
         volume['in-use'] = self._is_connected(payload)
         volume['iqn'] = self._iqn(payload)
         self.display(volume, ['account_id', 'status', 'size', 'node_id',
                      'node-url', 'in-use', 'iqn', 'created_at',
                      'last_modified'])
 
-        print("\nThis is a summary, use --no-summary "
-              "to see the entire response")
+        self.note("\nThis is a summary, use --no-summary "
+                  "to see the entire response")
 
     @opt('--id', help="id that will identify the new volume")
     @opt('--vtype', help="the type of volume to create")
@@ -247,7 +328,7 @@ class Backup(LunrCommand):
 
     @noargs
     def list(self):
-        result = self.client.backups.list()
+        result = self.listing(self.client.backups)
         self.display(result, ['id', 'volume_id', 'status',
                      'size', 'created_at'])
 
@@ -287,9 +368,9 @@ class Account(LunrCommand):
          help="display active and disabled nodes")
     def list(self, all=None):
         if all:
-            resp = self.client.accounts.list()
+            resp = self.listing(self.client.accounts)
         else:
-            resp = self.client.accounts.list(status='ACTIVE')
+            resp = self.listing(self.client.accounts, status='ACTIVE')
         return self.display(resp, ['id', 'name', 'status'])
 
     @opt('-n', '--no-summary', action='store_true',
@@ -303,7 +384,7 @@ class Account(LunrCommand):
 
         results = []
         # Get a list of all volumes for this tenant id
-        client = LunrClient(self.get_admin(), debug=self.debug)
+        client = self.admin_client()
         volumes = client.volumes.list(account_id=resp['id'])
         #volumes = self.client.volumes.list(resp['id'])
         for volume in volumes:
@@ -316,9 +397,9 @@ class Account(LunrCommand):
             return self.display(response(results, 200),
                                 ['id', 'status', 'size'])
         else:
-            print("-- This account has no active volumes --")
-        print("\nThis is a summary, use --no-summary "
-              "to see the entire response")
+            self.note("-- This account has no active volumes --")
+        self.note("\nThis is a summary, use --no-summary "
+                  "to see the entire response")
 
     @opt('id', help="tenant id to create")
     def create(self, id):
@@ -353,9 +434,14 @@ class Node(LunrCommand):
     @opt('-s', '--dsh', action='store_true',
          help="Output a list of storage node hostnames for use with dsh")
     def list(self, all=None, dsh=None):
-        resp = self.client.nodes.list()
-        if not all:
-            resp = self.filter(resp, where={'status': 'ACTIVE'})
+        if all:
+            resp = self.listing(self.client.nodes)
+        else:
+            # The api filters by status, filter() guards against an api
+            # that ignores the parameter
+            resp = self.filter(self.listing(self.client.nodes,
+                                            status='ACTIVE'),
+                               where={'status': 'ACTIVE'})
         if dsh:
             for row in resp:
                 print(row['name'])
@@ -378,23 +464,72 @@ class Node(LunrCommand):
             return self.display(node)
 
         self.display(node)
-        url = "http://%s:%s" % (node['hostname'], node['port'])
-        volumes = StorageClient(url=url, debug=self.debug).volumes.list()
+        volumes = self.storage_client_factory(storage_url(node))\
+            .volumes.list()
         self.to_gb(volumes, 'size', 'gigs')
-        for i in range(0, len(volumes)):
-            try:
-                volumes[i]['tenant-id'] = self.client.volumes.get(
-                    volumes[i]['id'])['account_id']
-            except LunrHttpError as e:
-                if e.code != 404:
-                    raise
-                volumes[i]['tenant-id'] = 'DELETING'
-
-        print("")
+        # Fetch the api's view of the node in one request and join on id
+        owners = self.to_map(self.client.volumes.list(node_id=node['id']),
+                             'id')
+        for volume in volumes:
+            if volume['id'] in owners:
+                volume['tenant-id'] = owners[volume['id']]['account_id']
+            else:
+                volume['tenant-id'] = 'DELETING'
+
+        self.note("")
         self.display(volumes, ['id', 'tenant-id', 'size', 'gigs'])
 
-        print("\nThis is a summary, use --no-summary "
-              "to see the entire response")
+        self.note("\nThis is a summary, use --no-summary "
+                  "to see the entire response")
+
+    @opt('-c', '--concurrency', type=int, default=20,
+         help="the most nodes visited at once")
+    @opt('-t', '--timeout', type=int, default=30,
+         help="timeout for requests to each storage node")
+    @opt('-a', '--all', action='store_true',
+         help="visit active and disabled nodes")
+    def reconcile(self, concurrency=20, timeout=30, all=False):
+        """ Find orphaned, missing and mis-sized volumes on the nodes """
+        # Imported here to keep the command line quick to start
+        from lunrclient.fleet import Fleet, Finding
+        fleet = Fleet(self.client, concurrency=concurrency, timeout=timeout)
+        nodes = fleet.nodes(status=None if all else 'ACTIVE')
+        findings = (finding._asdict() for finding in fleet.reconcile(nodes))
+        if self.streaming():
+            # Written as each node answers, counted for the exit code
+            found = [0]
+
+            def counted():
+                for finding in findings:
+                    found[0] += 1
+                    yield finding
+            self.display(counted(), list(Finding._fields))
+            return 1 if found[0] else 0
+        findings = list(findings)
+        if not findings:
+            self.note("-- %d nodes reconciled, no differences found --"
+                      % len(nodes))
+            return 0
+        self.display(response(findings, 200), list(Finding._fields))
+        return 1
+
+    @opt('-c', '--concurrency', type=int, default=20,
+         help="the most nodes visited at once")
+    @opt('-p', '--per-host', type=int, default=4,
+         help="the most requests in flight to each node")
+    @opt('-t', '--timeout', type=int, default=30,
+         help="timeout for requests to each storage node")
+    @opt('-a', '--all', action='store_true',
+         help="show every export, not only those without a session")
+    def exports(self, concurrency=20, per_host=4, timeout=30, all=False):
+        """ Find exported volumes with no iSCSI session on every node """
+        from lunrclient.fleet import Fleet, ExportState
+        fleet = Fleet(self.client, concurrency=concurrency, timeout=timeout)
+        states = fleet.exports(per_host=per_host)
+        # Written as each node answers unless displayed as a table
+        self.display((state._asdict() for state in states
+                      if all or state.state in ('no-session', 'error')),
+                     list(ExportState._fields))
 
     @opt('-H', '--hostname', required=True, help='api hostname')
     @opt('-P', '--port', required=True, help="api port")
@@ -496,13 +631,104 @@ class Export(LunrCommand):
             return 1
 
 
+class Metrics(LunrCommand):
+    """
+    Export fleet metrics for prometheus
+    """
+
+    def __init__(self):
+        # Give our sub command a name
+        self._name = 'metrics'
+        # let the base class setup methods in our class
+        LunrCommand.__init__(self)
+        self.opt('--admin', default=None, help="the admin tenant id")
+
+    def pre_command(self):
+        self.client = self.lunr_client_factory(self.get_admin())
+
+    @opt('-p', '--port', type=int, default=9490, help="port to listen on")
+    @opt('-H', '--host', default='', help="address to listen on")
+    @opt('-i', '--interval', type=int, default=60,
+         help="seconds between sweeps of the fleet")
+    @opt('-c', '--concurrency', type=int, default=20,
+         help="the most requests in flight at once")
+    @opt('-t', '--timeout', type=int, default=10,
+         help="timeout for requests to each storage node")
+    def serve(self, port, host, interval, concurrency, timeout):
+        """ Serve the fleet metrics on http://host:port/metrics """
+        # Imported here to keep the command line quick to start
+        from lunrclient.exporter import Exporter, FleetCollector
+        collector = FleetCollector(self.client, concurrency=concurrency,
+                                   timeout=timeout)
+        print("-- Serving metrics on http://%s:%d/metrics"
+              % (host or '0.0.0.0', port))
+        Exporter(collector, interval=interval).serve(host, port)
+
+    @noargs
+    def show(self):
+        """ Sweep the fleet once and print the metrics """
+        from lunrclient.exporter import FleetCollector
+        print(FleetCollector(self.client).collect().render(), end='')
+
+
+class Inventory(LunrCommand):
+    """
+    Query a local snapshot of the fleet
+    """
+
+    def __init__(self):
+        # Give our sub command a name
+        self._name = 'inventory'
+        # let the base class setup methods in our class
+        LunrCommand.__init__(self)
+        self.opt('--admin', default=None, help="the admin tenant id")
+        self.opt('--db', default=None, help="path of the snapshot (defaults "
+                 "to LUNR_INVENTORY or ~/.cache/lunrclient/inventory.sqlite)")
+
+    @opt('-e', '--exports', action='store_true',
+         help="also fetch the export of each changed volume")
+    @opt('-c', '--concurrency', type=int, default=20,
+         help="the most export requests in flight at once")
+    @opt('-m', '--export-max-age', type=int, default=3600,
+         help="seconds before the export of an unchanged volume is "
+         "fetched again")
+    def sync(self, exports=False, concurrency=20, export_max_age=3600):
+        """ Update the snapshot with any changes from the api """
+        # Imported here to keep the command line quick to start
+        from lunrclient.inventory import Inventory as FleetInventory
+        stats = FleetInventory(self.db).sync(self.admin_client(),
+                                             exports=exports,
+                                             concurrency=concurrency,
+                                             export_max_age=export_max_age)
+        rows = [{'table': table, 'total': total, 'changed': changed,
+                 'deleted': deleted}
+                for table, (total, changed, deleted) in stats.items()]
+        self.display(response(rows, 200),
+                     ['table', 'total', 'changed', 'deleted'])
+
+    @opt('sql', help="a read only sql query IE: \"SELECT id, size FROM "
+         "volumes WHERE status = 'ACTIVE' AND size > 500\"")
+    def query(self, sql):
+        """ Query the nodes, accounts, volumes, backups and exports """
+        from lunrclient.inventory import Inventory as FleetInventory
+        columns, rows = FleetInventory(self.db).query(sql)
+        self.display(response(rows, 200), columns)
+
+
 def main():
     try:
         # Create the top-level parser
         desc = "Command line interface to the lunr api"
-        parser = SubCommandParser([Backup(), Volume(), Env(),
-                                  Node(), Export(), Account()],
-                                  desc=desc)
+        parser = SubCommandParser([
+            LazySubCommand('backup', Backup),
+            LazySubCommand('volume', Volume),
+            LazySubCommand('env', Env),
+            LazySubCommand('node', Node),
+            LazySubCommand('export', Export),
+            LazySubCommand('account', Account),
+            LazySubCommand('metrics', Metrics),
+            LazySubCommand('inventory', Inventory)], desc=desc,
+            completion_cache=index_path('lunr'))
         # execute the command requested
         return parser.run()
 
@@ -514,4 +740,6 @@ def main():
     except ShellError as e:
         print(e.msg)
         return e.help()
+    except SubCommandError as e:
+        print(str(e))
     return 1
@@ -0,0 +1,114 @@
+# Copyright 2011-2016 Rackspace US, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from threading import Thread
+
+
+class Done(object):
+    """
+    A page that has already been fetched
+    """
+
+    def __init__(self, value):
+        self.value = value
+
+    def result(self):
+        return self.value
+
+
+class Prefetch(object):
+    """
+    Calls 'fetch(**params)' in a background thread, result() waits for
+    and returns its result or raises its exception
+    """
+
+    def __init__(self, fetch, params):
+        self.value = self.error = None
+        self.thread = Thread(target=self.run, args=(fetch, params))
+        # An abandoned listing must not keep the process alive
+        self.thread.daemon = True
+        self.thread.start()
+
+    def run(self, fetch, params):
+        try:
+            self.value = fetch(**params)
+        except Exception as e:
+            self.error = e
+
+    def result(self):
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+class Pages(object):
+    """
+    Iterates a listing one page of 'limit' items at a time, asking for
+    the items after the last one seen with the 'marker' parameter. Pages
+    are fetched as the iteration reaches them, so stopping early skips
+    the rest of the listing
+
+        for volume in client.iter_volumes(status='ERROR'):
+            break
+
+    :param list: the list() method of the resource, such as volumes.list
+    :param limit: the items asked for with each request
+    :param prefetch: fetch the next page while the current one is consumed
+    """
+
+    def __init__(self, list, limit=100, prefetch=False, **filters):
+        self.list = list
+        self.limit = limit
+        self.prefetch = prefetch
+        self.filters = filters
+
+    def fetch(self, marker):
+        """
+        Request the page after 'marker', in the background if prefetching
+        """
+        params = dict(self.filters, limit=self.limit)
+        if marker is not None:
+            params['marker'] = marker
+        if self.prefetch:
+            return Prefetch(self.list, params)
+        return Done(self.list(**params))
+
+    def __iter__(self):
+        first, count = None, 0
+        pending = self.fetch(None)
+        while pending is not None:
+            page = pending.result()
+            if len(page) > self.limit:
+                # The api ignored 'limit' and returned every item
+                for item in page[count:]:
+                    yield item
+                return
+            if page and page[0]['id'] == first:
+                # The api ignored 'marker' and returned the first page
+                # again, continue from a single listing instead
+                for item in self.list(**self.filters)[count:]:
+                    yield item
+                return
+            if first is None and page:
+                first = page[0]['id']
+            more = len(page) == self.limit
+            pending = None
+            if more and self.prefetch:
+                pending = self.fetch(page[-1]['id'])
+            for item in page:
+                yield item
+            count += len(page)
+            if more and pending is None:
+                pending = self.fetch(page[-1]['id'])
@@ -0,0 +1,214 @@
+# Copyright 2011-2016 Rackspace US, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from six.moves import intern
+import six
+
+
+def shared(value):
+    """
+    Return the interned copy of the string 'value', like strings share
+    one copy and it is freed once no record refers to it
+    """
+    if six.PY2 and isinstance(value, six.text_type):
+        # Only byte strings can be interned on python 2, the json
+        # module decodes unicode
+        try:
+            value = value.encode('ascii')
+        except UnicodeError:
+            return value
+    if isinstance(value, str):
+        return intern(value)
+    return value
+
+
+def plain(value):
+    """
+    The json 'default' hook, lets json.dumps() write records
+    """
+    if isinstance(value, Record):
+        return value.to_dict()
+    raise TypeError("%r is not JSON serializable" % (value,))
+
+
+class Record(object):
+    """
+    A resource returned by the api, held in slots instead of a dict.
+    Fields the class does not name are kept in a dict of their own.
+    Works as a read/write mapping for callers that expect a dict, and
+    the fields are attributes too
+
+        volume['status'] == volume.status
+    """
+    __slots__ = ('_extra',)
+    FIELDS = ()
+    # Only fields with few distinct values are worth interning
+    INTERNED = ('status', 'volume_type_name', 'node_id')
+
+    def __init__(self, data=None):
+        self._extra = None
+        for key, value in (data or {}).items():
+            self[key] = value
+
+    def __setitem__(self, key, value):
+        if key not in self.FIELDS:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+            return
+        if key in self.INTERNED:
+            value = shared(value)
+        setattr(self, key, value)
+
+    def __getitem__(self, key):
+        if key in self.FIELDS:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key)
+        if self._extra is None:
+            raise KeyError(key)
+        return self._extra[key]
+
+    def __delitem__(self, key):
+        if key in self.FIELDS:
+            try:
+                delattr(self, key)
+                return
+            except AttributeError:
+                raise KeyError(key)
+        if self._extra is None:
+            raise KeyError(key)
+        del self._extra[key]
+
+    def __contains__(self, key):
+        try:
+            self[key]
+        except KeyError:
+            return False
+        return True
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self):
+        # A field that was never set is absent, not None
+        keys = [key for key in self.FIELDS if hasattr(self, key)]
+        return keys + list(self._extra or ())
+
+    def values(self):
+        return [self[key] for key in self.keys()]
+
+    def items(self):
+        return [(key, self[key]) for key in self.keys()]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def to_dict(self):
+        return dict(self.items())
+
+    def __eq__(self, other):
+        if not isinstance(other, (Record, dict)):
+            return NotImplemented
+        return self.to_dict() == dict(other.items())
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    __hash__ = None
+
+    def __repr__(self):
+        return '%s(%r)' % (type(self).__name__, self.to_dict())
+
+
+# The subclasses response() makes, by record type
+RESPONSES = {}
+
+
+def response(record, data, code):
+    """
+    Return 'data' as a 'record' that also has get_code() like the
+    responses of the api
+    """
+    if record not in RESPONSES:
+        RESPONSES[record] = type(record.__name__, (record,), {
+            '__slots__': ('_code',), 'get_code': lambda self: self._code})
+    result = RESPONSES[record](data)
+    result._code = code
+    return result
+
+
+class Stream(object):
+    """
+    Converts the items of a JSONStream to 'record' as they are read,
+    close() closes the stream
+    """
+
+    def __init__(self, stream, record):
+        self.stream = stream
+        self.record = record
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return self.record(next(self.stream))
+
+    next = __next__
+
+    def close(self):
+        self.stream.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class Volume(Record):
+    __slots__ = FIELDS = ('id', 'name', 'account_id', 'node_id', 'status',
+                          'size', 'volume_type_name', 'restore_of',
+                          'created_at', 'last_modified')
+
+
+class Backup(Record):
+    __slots__ = FIELDS = ('id', 'account_id', 'volume_id', 'status', 'size',
+                          'created_at', 'last_modified')
+
+
+class Node(Record):
+    __slots__ = FIELDS = ('id', 'name', 'status', 'volume_type_name',
+                          'hostname', 'port', 'storage_hostname',
+                          'storage_port', 'size', 'affinity_group', 'meta',
+                          'created_at', 'last_modified')
+
+
+class Account(Record):
+    __slots__ = FIELDS = ('id', 'name', 'status', 'created_at',
+                          'last_modified')
+
+
+class Export(Record):
+    __slots__ = FIELDS = ('id', 'status', 'instance_id', 'mountpoint', 'ip',
+                          'initiator', 'session_ip', 'session_initiator',
+                          'target_name', 'created_at', 'last_modified')
@@ -0,0 +1,68 @@
+# Copyright 2011-2016 Rackspace US, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import random
+import time
+
+
+# Methods that are safe to repeat
+IDEMPOTENT = ('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE')
+
+
+class RetryPolicy(object):
+    """
+    Decides if and when a failed request is retried
+
+    :param retries: the maximum number of retries for a request
+    :param backoff: the base delay in seconds, doubled on each retry
+    :param max_backoff: the longest delay between two attempts
+    :param max_elapsed: give up once a request has taken this long
+    :param statuses: http status codes that are considered transient
+    :param methods: http methods that may be retried, connection
+                    errors and timeouts are retried for these too
+    """
+
+    def __init__(self, retries=3, backoff=0.5, max_backoff=30,
+                 max_elapsed=120, statuses=(409, 503), methods=IDEMPOTENT):
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_elapsed = max_elapsed
+        self.statuses = statuses
+        self.methods = methods
+
+    def delay(self, attempt):
+        """
+        Exponential backoff with full jitter, so many clients
+        that failed at the same time don't retry in lock step
+        """
+        ceiling = min(self.max_backoff, self.backoff * (2 ** attempt))
+        return random.uniform(0, ceiling)
+
+    def should_retry(self, method, attempt, elapsed, status=None):
+        """
+        Return the seconds to wait before retrying or None to give up.
+        'status' is None if the request failed without a response
+        """
+        if attempt >= self.retries or method.upper() not in self.methods:
+            return None
+        if status is not None and status not in self.statuses:
+            return None
+        delay = self.delay(attempt)
+        if elapsed + delay > self.max_elapsed:
+            return None
+        return delay
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
@@ -52,4 +52,11 @@ class Env(SubCommand):
         print("export OS_USERNAME='demo'")
         print("export OS_PASSWORD='devstack'")
         print("export OS_AUTH_URL='http://localhost:5000/v2.0'")
+        print("# Where Auth tokens are cached until they expire "
+              "(empty to disable)")
+        print("export LUNR_AUTH_CACHE='~/.cache/lunrclient/tokens.json'")
+        print("# Seconds to cache node and account lookups (unset to disable)")
+        print("export LUNR_CACHE_TTL='300'")
+        print("# Where 'lunr inventory' keeps its snapshot")
+        print("export LUNR_INVENTORY='~/.cache/lunrclient/inventory.sqlite'")
         return 0
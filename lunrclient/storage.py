@@ -15,7 +15,7 @@
 import uuid
 import time
 
-from lunrclient.base import BaseAPI
+from lunrclient.base import BaseAPI, missing_as_none
 
 
 class StorageAPI(BaseAPI):
@@ -57,6 +57,13 @@ class StorageVolume(StorageAPI):
         """
         return self.http_get('/volumes')
 
+    def stream(self):
+        """
+        same as list() but returns a generator that yields
+        each volume as soon as it is received
+        """
+        return self.http_stream('/volumes')
+
     def get(self, volume_id):
         """
         get the details of a volume
@@ -105,6 +112,36 @@ class StorageVolume(StorageAPI):
         """
         return self.http_get('/volumes/%s/lock' % volume_id)
 
+    def wait_for(self, volume_id, predicate=None, **kwargs):
+        """
+        wait until the volume exists and 'predicate(volume)' is true,
+        kwargs are passed to BaseAPI.poll() (timeout, interval, etc..)
+        """
+        predicate = predicate or (lambda volume: True)
+        return self.poll(lambda: missing_as_none(self.get, volume_id),
+                         lambda v: v is not None and predicate(v), **kwargs)
+
+    def wait_for_delete(self, volume_id, **kwargs):
+        """
+        wait until the volume no longer exists
+        """
+        self.poll(lambda: missing_as_none(self.get, volume_id),
+                  lambda volume: volume is None, **kwargs)
+
+    def wait_for_all(self, volume_ids, predicate=None, **kwargs):
+        """
+        wait until all the volumes exist and 'predicate' is true for each,
+        polls with a single list() call. Returns a dict of id to volume
+        """
+        ids = set(volume_ids)
+        predicate = predicate or (lambda volume: True)
+
+        def fetch():
+            return dict((v['id'], v) for v in self.list() if v['id'] in ids)
+
+        return self.poll(fetch, lambda found: all(
+            id in found and predicate(found[id]) for id in ids), **kwargs)
+
 
 class StorageBackup(StorageAPI):
 
@@ -125,7 +162,7 @@ class StorageBackup(StorageAPI):
         create a backup of a volume
         """
         backup_id = backup_id or str(uuid.uuid4())
-        timestamp = timestamp or int(time())
+        timestamp = timestamp or int(time.time())
         return self.http_put('/volumes/%s/backups/%s' % (volume_id, backup_id),
                              params={'timestamp': timestamp})
 
@@ -136,6 +173,32 @@ class StorageBackup(StorageAPI):
         return self.http_delete('/volumes/%s/backups/%s' %
                                 (volume_id, backup_id))
 
+    def wait_for(self, volume_id, backup_id, predicate=None, **kwargs):
+        """
+        wait until the backup is listed and 'predicate(backup)' is true.
+        (The storage node may return 404 from get() before the backup is
+        complete, so this polls list()) kwargs are passed to BaseAPI.poll()
+        """
+        return self.wait_for_all(volume_id, [backup_id], predicate,
+                                 **kwargs)[backup_id]
+
+    def wait_for_delete(self, volume_id, backup_id, **kwargs):
+        """
+        wait until the backup is no longer listed
+        """
+        self.poll(lambda: self.list(volume_id),
+                  lambda backups: backup_id not in backups, **kwargs)
+
+    def wait_for_all(self, volume_id, backup_ids, predicate=None, **kwargs):
+        """
+        wait until all the backups of the volume are listed and 'predicate'
+        is true for each. Returns the backup listing
+        """
+        predicate = predicate or (lambda backup: True)
+        return self.poll(lambda: self.list(volume_id), lambda backups: all(
+            id in backups and predicate(backups[id]) for id in backup_ids),
+            **kwargs)
+
 
 class StorageExport(StorageAPI):
 
@@ -15,18 +15,14 @@
 from __future__ import print_function
 
 from lunrclient.subcommand import SubCommand, SubCommandParser, opt, noargs
+from lunrclient.subcommand import LazySubCommand, SubCommandError
+from lunrclient.completion import index_path
 from lunrclient.client import StorageClient
 from lunrclient.displayable import Displayable
 from lunrclient.shared import Env, ShellError
 from lunrclient.base import LunrError, LunrHttpError
 from pprint import pprint
 
-try:
-    from lunrclient.tools import Tools
-except ImportError:
-    print("-- Warning: Failed to load tools module, Missing dependency?")
-    Tools = object
-
 
 class StorageCommand(SubCommand, Displayable):
 
@@ -38,6 +34,7 @@ class StorageCommand(SubCommand, Displayable):
                  const=True, default=False, help="print the REST calls used")
         self.opt('-H', '--host', default=None,
                  help="hostname or ip for the storage node")
+        self.display_options()
 
     def pre_command(self):
         if self.host:
@@ -60,7 +57,10 @@ class Volume(StorageCommand):
 
     @noargs
     def list(self):
-        result = self.storage.volumes.list()
+        if self.incremental():
+            result = self.storage.volumes.stream()
+        else:
+            result = self.storage.volumes.list()
         self.display(result, ['id', 'path', 'size'])
 
     @opt('id', help="volume id to get")
@@ -123,6 +123,8 @@ class Backup(StorageCommand):
          "specified volume id")
     def list(self, src):
         result = self.storage.backups.list(src)
+        if self.streaming():
+            return self.display(result)
         pprint(result)
 
     @opt('id', metavar='<backup-id>', help="backup id to get")
@@ -203,8 +205,15 @@ def main():
     try:
         # Create the top-level parser
         desc = "Command line interface to the lunr storage api"
-        parser = SubCommandParser([Backup(), Volume(), Env(),
-                                   Tools(), Status(), Export()], desc=desc)
+        parser = SubCommandParser([
+            LazySubCommand('backup', Backup),
+            LazySubCommand('volume', Volume),
+            LazySubCommand('env', Env),
+            # Only import the storage tools if they are requested
+            LazySubCommand('tools', 'lunrclient.tools:Tools'),
+            LazySubCommand('status', Status),
+            LazySubCommand('export', Export)], desc=desc,
+            completion_cache=index_path('storage'))
         # execute the command requested
         return parser.run()
 
@@ -215,3 +224,6 @@ def main():
     except ShellError as e:
         print(e.msg)
         return e.help()
+    except SubCommandError as e:
+        print(str(e))
+    return 1
@@ -2,8 +2,10 @@ from __future__ import print_function
 
 from argparse import ArgumentParser, RawDescriptionHelpFormatter
 from collections import namedtuple
+from importlib import import_module
 from os.path import basename
 from textwrap import dedent
+from lunrclient import completion
 
 import inspect
 import sys
@@ -30,14 +32,60 @@ def noargs(method):
     return method
 
 
+# The names of the methods with options, cached per class
+_option_names = {}
+
+
+def option_names(cls):
+    """
+    Return the names of the methods on 'cls' that have options
+    """
+    if cls not in _option_names:
+        names = []
+        # Inspect the class so properties are not evaluated
+        for name in dir(cls):
+            if name.startswith('__'):
+                continue
+            # If the method has an options attribute
+            if hasattr(getattr(cls, name), 'options'):
+                names.append(name)
+        _option_names[cls] = names
+    return _option_names[cls]
+
+
 class SubCommandError(Exception):
     pass
 
 
+class LazySubCommand(object):
+    """
+    Stands in for a SubCommand until it is selected on the command line.
+    'factory' is a SubCommand class or a 'module:Class' string, such that
+    the module is only imported when the sub command is needed
+    """
+
+    def __init__(self, name, factory):
+        self._name = name
+        self.factory = factory
+
+    def resolve(self):
+        """
+        Return the SubCommand class, importing it if needed
+        """
+        if isinstance(self.factory, str):
+            module, attr = self.factory.split(':')
+            self.factory = getattr(import_module(module), attr)
+        return self.factory
+
+    def load(self):
+        return self.resolve()()
+
+
 class SubCommandParser(object):
 
-    def __init__(self, sub_commands, desc=None):
+    def __init__(self, sub_commands, desc=None, completion_cache=None):
         self.sub_commands = self.build_dict(sub_commands)
+        self.completion_cache = completion_cache
         self.prog = None
         self.desc = desc
 
@@ -78,11 +126,24 @@ class SubCommandParser(object):
                 # Remove the sub command argument
                 args.pop(index)
                 # Run the sub-command passing the remaining arguments
-                return self.sub_commands[arg](args, prog)
+                return self.get(arg)(args, prog)
 
         # Unable to find a suitable sub-command
         return self.help()
 
+    def get(self, name):
+        """
+        Return the sub command, constructing it if it was registered lazily
+        """
+        cmd = self.sub_commands[name]
+        if isinstance(cmd, LazySubCommand):
+            try:
+                cmd = self.sub_commands[name] = cmd.load()
+            except ImportError as e:
+                raise SubCommandError("-- Failed to load the '%s' command, "
+                                      "Missing dependency? (%s)" % (name, e))
+        return cmd
+
     def bash_completion_script(self, prog):
         print('_%(prog)s() {\n'
               '  local cur="${COMP_WORDS[COMP_CWORD]}"\n'
@@ -95,9 +156,14 @@ class SubCommandParser(object):
         # args = ['--bash-completion', '%prog', 'sub-command', 'command']
         try:
             # If a subcommand is already present
-            if args[2] in self.sub_commands.keys():
-                # Have the subcommand print out all possible commands
-                return self.sub_commands[args[2]].bash_completion()
+            cmd = self.sub_commands[args[2]]
+            # Answer from the index rather than loading the sub command
+            if isinstance(cmd, LazySubCommand):
+                print(' '.join(self.completion_index().get(args[2], [])),
+                      end=' ')
+                return 0
+            # Have the subcommand print out all possible commands
+            return cmd.bash_completion()
         except (KeyError, IndexError):
             pass
 
@@ -105,6 +171,37 @@ class SubCommandParser(object):
         print(' '.join(self.sub_commands.keys()))
         return 0
 
+    def completion_index(self):
+        """
+        Return a dict of sub command names to their command names,
+        read from the completion cache if it is still current
+        """
+        cached = None
+        if self.completion_cache:
+            cached = completion.load(self.completion_cache)
+        if cached:
+            return cached['index']
+
+        index = self.build_index()
+        if self.completion_cache:
+            completion.save(self.completion_cache,
+                            list(self.sub_commands.keys()), index)
+        return index
+
+    def build_index(self):
+        index = {}
+        for name, cmd in self.sub_commands.items():
+            if not isinstance(cmd, LazySubCommand):
+                index[name] = list(cmd._commands.keys())
+                continue
+            try:
+                names = option_names(cmd.resolve())
+            except ImportError:
+                # Missing dependency, offer no completions
+                names = []
+            index[name] = [re.sub('_', '-', method) for method in names]
+        return index
+
     def help(self):
         print("Usage: %s <command> [-h]\n" % self.prog)
         if self.desc:
@@ -161,15 +258,8 @@ class SubCommand(object):
 
     def methods_with_opts(self):
         result = {}
-        # get a listing of all the methods
-        for name in dir(self):
-            if name.startswith('__'):
-                continue
-            method = getattr(self, name)
-            # If the method has an options attribute
-            if hasattr(method, 'options'):
-                name = re.sub('_', '-', name)
-                result[name] = method
+        for name in option_names(self.__class__):
+            result[re.sub('_', '-', name)] = getattr(self, name)
         return result
 
     def call_method(self, args, method):
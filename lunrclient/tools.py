@@ -44,12 +44,18 @@ class Tools(SubCommand):
     def __init__(self):
         # Give our sub command a name
         self._name = 'tools'
-        # Create a volume helper with our local storage config
-        self.volume = VolumeHelper(LunrConfig.from_storage_conf())
+        self._volume = None
         # let the base class setup methods in our class
         SubCommand.__init__(self)
         self.total = defaultdict(float)
 
+    @property
+    def volume(self):
+        # Only read the local storage config if a tool needs it
+        if self._volume is None:
+            self._volume = VolumeHelper(LunrConfig.from_storage_conf())
+        return self._volume
+
     def dot(self):
         sys.stdout.write('.')
         sys.stdout.flush()
@@ -0,0 +1,119 @@
+# Copyright 2011-2016 Rackspace US, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from six.moves.urllib.parse import urlparse
+from collections import OrderedDict
+from threading import Lock
+import time
+
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_MAX_HOSTS = 256
+DEFAULT_IDLE_TIMEOUT = 300
+
+
+class Transport(object):
+    """
+    A single pooled HTTP session shared by all the resource
+    APIs (volumes, backups, nodes, etc..) of a client
+    """
+
+    def __init__(self, pool_size=None, keep_alive=True):
+        # Imported here to keep the command line quick to start
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.pool_size = pool_size or DEFAULT_POOL_SIZE
+        self.keep_alive = keep_alive
+        self.session = requests.Session()
+        if not keep_alive:
+            self.session.headers['Connection'] = 'close'
+
+        adapter = HTTPAdapter(pool_connections=self.pool_size,
+                              pool_maxsize=self.pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def close(self):
+        """
+        Close all the pooled connections held by this transport
+        """
+        self.session.close()
+
+
+class TransportRegistry(object):
+    """
+    A process wide cache of transports keyed by host, such that
+    repeated calls to the same storage node re-use warm connections.
+
+    The least recently used transport is closed when more than
+    'max_hosts' are cached, transports not used for 'idle_timeout'
+    seconds are closed the next time the registry is accessed.
+    """
+
+    def __init__(self, max_hosts=DEFAULT_MAX_HOSTS,
+                 idle_timeout=DEFAULT_IDLE_TIMEOUT, pool_size=None):
+        self.max_hosts = max_hosts
+        self.idle_timeout = idle_timeout
+        self.pool_size = pool_size
+        self.transports = OrderedDict()
+        self.lock = Lock()
+
+    def key(self, url):
+        parts = urlparse(url)
+        return "%s://%s" % (parts.scheme, parts.netloc)
+
+    def get(self, url):
+        """
+        Return the cached transport for the host in 'url',
+        creating a new one if none is cached
+        """
+        key = self.key(url)
+        now = time.time()
+        with self.lock:
+            self._expire(now)
+            try:
+                transport, _ = self.transports.pop(key)
+            except KeyError:
+                transport = Transport(pool_size=self.pool_size)
+            # Re-insert to mark as the most recently used
+            self.transports[key] = (transport, now)
+            while len(self.transports) > self.max_hosts:
+                _, (evicted, _) = self.transports.popitem(last=False)
+                evicted.close()
+        return transport
+
+    def _expire(self, now):
+        # Oldest entries are first, stop at the first one still in use
+        for key, (transport, used) in list(self.transports.items()):
+            if now - used < self.idle_timeout:
+                break
+            del self.transports[key]
+            transport.close()
+
+    def clear(self):
+        """
+        Close and forget all the cached transports
+        """
+        with self.lock:
+            for transport, _ in self.transports.values():
+                transport.close()
+            self.transports.clear()
+
+    def __len__(self):
+        return len(self.transports)
+
+
+# The registry shared by all clients in this process
+registry = TransportRegistry()
@@ -0,0 +1,47 @@
+# Copyright 2011-2016 Rackspace US, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from unittest import TestCase, skipIf
+from requests_mock import Adapter
+from json import dumps
+import sys
+
+
+@skipIf(sys.version_info < (3, 4), "asyncio requires python 3")
+class TestAsyncStorageClient(TestCase):
+
+    def test_gather(self):
+        import asyncio
+        from lunrclient.aio import AsyncStorageClient
+
+        client = AsyncStorageClient("mock://", concurrency=2)
+        adapter = Adapter()
+        client.client.transport.session.mount('mock', adapter)
+        adapter.register_uri('GET', 'mock:///volumes',
+                             text=dumps([{'id': 'thrawn'}]))
+        adapter.register_uri('GET', 'mock:///status',
+                             text=dumps({'volumes': 1}))
+
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            volumes, status = loop.run_until_complete(asyncio.gather(
+                client.volumes.list(), client.status.list()))
+        finally:
+            asyncio.set_event_loop(None)
+            loop.close()
+            client.close()
+
+        self.assertEqual(volumes[0]['id'], 'thrawn')
+        self.assertEqual(status['volumes'], 1)
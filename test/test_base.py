@@ -0,0 +1,281 @@
+# Copyright 2011-2016 Rackspace US, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from unittest import TestCase
+from lunrclient.client import StorageClient, LunrClient
+from lunrclient.base import LunrError, LunrHttpError, LunrTimeout
+from lunrclient.base import JSONStream, Truncated, log
+from lunrclient.retry import RetryPolicy
+from lunrclient.hooks import Hooks, TimingCollector, url_template
+
+from requests_mock import Adapter
+from json import dumps
+import logging
+
+
+class TestRetry(TestCase):
+
+    def setUp(self):
+        self.retry = RetryPolicy(retries=2)
+        self.sleeps = []
+        self.retry.sleep = self.sleeps.append
+        self.client = StorageClient("mock://", retry=self.retry)
+        self.adapter = Adapter()
+        self.client.transport.session.mount('mock', self.adapter)
+
+    def test_transient_status(self):
+        self.adapter.register_uri('GET', 'mock:///volumes', [
+            {'status_code': 503, 'text': 'Service Unavailable'},
+            {'status_code': 200, 'text': dumps([{'id': 'thrawn'}])}])
+
+        volumes = self.client.volumes.list()
+        self.assertEqual(volumes[0]['id'], 'thrawn')
+        self.assertEqual(len(self.sleeps), 1)
+        self.assertTrue(0 <= self.sleeps[0] <= self.retry.backoff)
+
+    def test_gives_up(self):
+        self.adapter.register_uri('DELETE', 'mock:///volumes/thrawn',
+                                  status_code=409,
+                                  text=dumps({'reason': 'busy'}))
+        with self.assertRaises(LunrHttpError) as cm:
+            self.client.volumes.delete('thrawn')
+        self.assertEqual(cm.exception.code, 409)
+        self.assertEqual(self.adapter.call_count, 3)
+
+    def test_not_idempotent(self):
+        self.adapter.register_uri('POST', 'mock:///volumes/thrawn',
+                                  status_code=503,
+                                  text=dumps({'reason': 'busy'}))
+        self.assertRaises(LunrHttpError, self.client.volumes.http_post,
+                          '/volumes/thrawn')
+        self.assertEqual(self.adapter.call_count, 1)
+
+    def test_permanent_status(self):
+        self.adapter.register_uri('GET', 'mock:///volumes/thrawn',
+                                  status_code=404,
+                                  text=dumps({'reason': 'not found'}))
+        self.assertRaises(LunrHttpError, self.client.volumes.get, 'thrawn')
+        self.assertEqual(self.adapter.call_count, 1)
+
+
+class TestWait(TestCase):
+
+    def setUp(self):
+        self.client = StorageClient("mock://")
+        self.adapter = Adapter()
+        self.client.transport.session.mount('mock', self.adapter)
+
+    def test_wait_for_delete(self):
+        self.adapter.register_uri('GET', 'mock:///volumes/thrawn', [
+            {'status_code': 200, 'text': dumps({'id': 'thrawn'})},
+            {'status_code': 404, 'text': dumps({'reason': 'not found'})}])
+        self.client.volumes.wait_for_delete('thrawn', interval=0.001)
+        self.assertEqual(self.adapter.call_count, 2)
+
+    def test_wait_for_all(self):
+        self.adapter.register_uri('GET', 'mock:///volumes', [
+            {'status_code': 200, 'text': dumps([{'id': 'a'}])},
+            {'status_code': 200, 'text': dumps([{'id': 'a'}, {'id': 'b'},
+                                                {'id': 'c'}])}])
+        found = self.client.volumes.wait_for_all(['a', 'b'],
+                                                 interval=0.001)
+        self.assertEqual(sorted(found.keys()), ['a', 'b'])
+        self.assertEqual(self.adapter.call_count, 2)
+
+    def test_timeout(self):
+        self.adapter.register_uri('GET', 'mock:///volumes/thrawn/backups',
+                                  text=dumps({}))
+        self.assertRaises(LunrTimeout, self.client.backups.wait_for,
+                          'thrawn', 'backup', timeout=0.01, interval=0.001)
+
+
+class Body(object):
+    """ A response that returns the body a few characters at a time """
+
+    def __init__(self, text, size):
+        self.text = text
+        self.size = size
+        self.encoding = None
+        self.closed = False
+
+    def iter_content(self, chunk_size, decode_unicode=False):
+        for i in range(0, len(self.text), self.size):
+            yield self.text[i:i + self.size]
+
+    def close(self):
+        self.closed = True
+
+
+class TestJSONStream(TestCase):
+
+    def test_chunks(self):
+        items = [{'id': 'a', 'size': 1, 'nested': {'list': [1, 2]}},
+                 12345, "a string, with [brackets]", None, {}]
+        text = ' [ ' + ' ,\n'.join(dumps(item) for item in items) + ' ] '
+        for size in (1, 2, 3, 7, len(text)):
+            body = Body(text, size)
+            self.assertEqual(list(JSONStream(body)), items)
+            self.assertTrue(body.closed)
+
+    def test_numbers(self):
+        # Numbers split across chunks such as '1.' or '1e'
+        items = [1.5, 1e3, -2.25e-2, 10, True, None, 7]
+        text = dumps(items)
+        for size in (1, 2, 3, 4):
+            self.assertEqual(list(JSONStream(Body(text, size))), items)
+
+    def test_not_a_list(self):
+        body = Body(dumps({'id': 'thrawn'}), 3)
+        self.assertEqual(list(JSONStream(body)), [{'id': 'thrawn'}])
+
+    def test_truncated(self):
+        body = Body('[{"id": "a"}, {"id": ', 3)
+        self.assertRaises(LunrError, list, JSONStream(body))
+        body = Body('<html>proxy</html>', 3)
+        self.assertRaises(LunrError, list, JSONStream(body))
+
+    def test_close(self):
+        # Closed though never read
+        body = Body(dumps([1, 2]), 3)
+        JSONStream(body).close()
+        self.assertTrue(body.closed)
+        body = Body(dumps([1, 2]), 3)
+        with JSONStream(body) as stream:
+            self.assertEqual(next(stream), 1)
+        self.assertTrue(body.closed)
+        self.assertEqual(list(stream), [])
+
+    def test_stream(self):
+        client = LunrClient('admin', url='http://api')
+        adapter = Adapter()
+        client.transport.session.mount('http://api', adapter)
+        adapter.register_uri('GET', 'http://api/v1.0/admin/volumes',
+                             text=dumps([{'id': 'a'}, {'id': 'b'}]))
+        volumes = client.volumes.stream(status='ACTIVE')
+        self.assertEqual([v['id'] for v in volumes], ['a', 'b'])
+        self.assertEqual(adapter.last_request.qs, {'status': ['active']})
+
+
+class TestLogging(TestCase):
+
+    def test_enable_debug(self):
+        root = logging.getLogger()
+        handlers, level = list(root.handlers), root.level
+        try:
+            StorageClient("mock://", debug=True)
+            LunrClient('admin', url='mock://', debug=True)
+            added = [h for h in log.handlers if getattr(h, 'lunr_debug', 0)]
+            self.assertEqual(len(added), 1)
+            self.assertEqual((root.handlers, root.level), (handlers, level))
+        finally:
+            for handler in added:
+                log.removeHandler(handler)
+            log.setLevel(logging.NOTSET)
+            log.propagate = True
+
+    def test_truncated(self):
+        self.assertEqual(str(Truncated('abc', limit=5)), 'abc')
+        self.assertEqual(str(Truncated(lambda: 'a' * 10, limit=4)),
+                         'aaaa... (10 characters)')
+
+    def test_unused(self):
+        api = StorageClient("mock://").volumes
+        params = {'size': 1}
+        self.assertIs(api.unused(params), params)
+        self.assertEqual(api.unused({'size': 1, 'id': None}), {'size': 1})
+
+
+class TestHooks(TestCase):
+
+    def setUp(self):
+        self.timings = TimingCollector()
+        self.client = StorageClient("mock://storage", hooks=[self.timings],
+                                    retry=RetryPolicy(retries=1))
+        self.client.retry.sleep = lambda seconds: None
+        self.adapter = Adapter()
+        self.client.transport.session.mount('mock', self.adapter)
+
+    def test_url_template(self):
+        self.assertEqual(url_template('/v1.0/tenant/volumes/vol-1/backups'),
+                         '/v1.0/{tenant_id}/volumes/{id}/backups')
+        self.assertEqual(url_template('/volumes'), '/volumes')
+
+    def test_events(self):
+        events = []
+
+        class Recorder(Hooks):
+            def pre_request(self, event):
+                events.append(('pre', event.template, event.attempt))
+
+            def post_response(self, event):
+                events.append(('post', event.status, event.attempt))
+
+            def on_error(self, event):
+                events.append(('error', event.status, event.attempt))
+
+        self.client.hooks.append(Recorder())
+        self.adapter.register_uri('GET', 'mock://storage/volumes/thrawn', [
+            {'status_code': 503, 'text': 'Service Unavailable'},
+            {'status_code': 200, 'text': dumps({'id': 'thrawn'})}])
+        self.client.volumes.get('thrawn')
+        self.assertEqual(events, [('pre', '/volumes/{id}', 0),
+                                  ('error', 503, 0),
+                                  ('pre', '/volumes/{id}', 1),
+                                  ('post', 200, 1)])
+
+    def test_bytes(self):
+        sizes = []
+
+        class Recorder(Hooks):
+            def post_response(self, event):
+                sizes.append(event.bytes)
+
+        self.client.hooks.append(Recorder())
+        body = dumps({'id': 'thrawn'})
+        # Sent without a Content-Length, as chunked responses are
+        self.adapter.register_uri('GET', 'mock://storage/volumes/thrawn',
+                                  text=body)
+        self.client.volumes.get('thrawn')
+        self.assertEqual(sizes, [len(body)])
+
+    def test_added_later(self):
+        # Hooks added to an empty list after the client is made
+        client = StorageClient("mock://storage", hooks=[])
+        client.transport.session.mount('mock', self.adapter)
+        self.adapter.register_uri('GET', 'mock://storage/volumes/thrawn',
+                                  text=dumps({'id': 'thrawn'}))
+        client.hooks.append(self.timings)
+        client.volumes.get('thrawn')
+        self.assertEqual(self.timings.summary()[0]['count'], 1)
+        client = StorageClient("mock://storage")
+        client.transport.session.mount('mock', self.adapter)
+        client.hooks.append(self.timings)
+        client.volumes.get('thrawn')
+        self.assertEqual(self.timings.summary()[0]['count'], 2)
+
+    def test_collector(self):
+        self.adapter.register_uri('GET', 'mock://storage/volumes/thrawn',
+                                  text=dumps({'id': 'thrawn'}))
+        self.adapter.register_uri('GET', 'mock://storage/volumes/pellaeon',
+                                  status_code=404, text='not found')
+        self.client.volumes.get('thrawn')
+        self.assertRaises(LunrHttpError, self.client.volumes.get, 'pellaeon')
+
+        summary = self.timings.summary()
+        self.assertEqual(len(summary), 1)
+        self.assertEqual(summary[0]['template'], '/volumes/{id}')
+        self.assertEqual(summary[0]['host'], 'storage')
+        self.assertEqual(summary[0]['count'], 2)
+        self.assertEqual(summary[0]['errors'], 1)
+        self.assertTrue(summary[0]['p50'] <= summary[0]['max'])
@@ -0,0 +1,202 @@
+# Copyright 2011-2016 Rackspace US, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from unittest import TestCase
+from lunrclient.client import Auth, StorageClient
+from lunrclient.cache import TokenCache, ResponseCache
+from lunrclient.base import LunrError, LunrHttpError
+
+from requests_mock import Adapter
+from tempfile import mkdtemp
+from shutil import rmtree
+from json import dumps
+import stat
+import os
+
+
+def token(expires):
+    return dumps({'access': {'token': {
+        'id': 'token-1',
+        'expires': expires,
+        'tenant': {'id': 'tenant-1', 'name': 'thrawn'}
+    }}})
+
+
+class TestAuth(TestCase):
+
+    def setUp(self):
+        self.dir = mkdtemp()
+        self.cache = TokenCache(os.path.join(self.dir, 'sub', 'tokens.json'))
+        self.adapter = Adapter()
+
+    def tearDown(self):
+        rmtree(self.dir)
+
+    def auth(self):
+        auth = Auth('mock://auth', 'thrawn', 'user', 'secret',
+                    cache=self.cache)
+        auth.session.mount('mock', self.adapter)
+        return auth
+
+    def test_cached_tenant_id(self):
+        self.adapter.register_uri('POST', 'mock://auth/tokens',
+                                  text=token('2999-01-01T00:00:00Z'))
+        self.assertEqual(self.auth().fetch_tenant_id(), 'tenant-1')
+        self.assertEqual(self.adapter.call_count, 1)
+
+        # The second lookup should not contact auth
+        auth = self.auth()
+        self.assertEqual(auth.fetch_tenant_id(), 'tenant-1')
+        self.assertEqual(auth.token, 'token-1')
+        self.assertEqual(self.adapter.call_count, 1)
+
+        # Only the current user may read the cache
+        mode = os.stat(self.cache.path).st_mode
+        self.assertEqual(stat.S_IMODE(mode), 0o600)
+
+    def test_expired_token(self):
+        self.adapter.register_uri('POST', 'mock://auth/tokens',
+                                  text=token('2000-01-01T00:00:00.000000Z'))
+        self.auth().fetch_tenant_id()
+        self.auth().fetch_tenant_id()
+        self.assertEqual(self.adapter.call_count, 2)
+
+
+class TestBatch(TestCase):
+
+    def test_results(self):
+        client = StorageClient("mock://node1", pool_size=4)
+        adapter = Adapter()
+        client.transport.session.mount('mock', adapter)
+        adapter.register_uri('DELETE', 'mock://node1/volumes/a', text='{}')
+        adapter.register_uri('DELETE', 'mock://node1/volumes/b',
+                             status_code=409, text=dumps({'reason': 'busy'}))
+
+        batch = client.batch(concurrency=4, per_host=2)
+        for id in ['a', 'b']:
+            batch.submit('volumes.delete', id)
+        results = sorted(batch.run())
+
+        self.assertEqual(len(results), 2)
+        self.assertEqual(results[0].args, ('a',))
+        self.assertIsNone(results[0].error)
+        self.assertEqual(results[1].error.code, 409)
+        # All the calls were run
+        self.assertEqual(list(batch.run()), [])
+
+    def test_unexpected_errors(self):
+        client = StorageClient("mock://node1")
+        adapter = Adapter()
+        client.transport.session.mount('mock', adapter)
+        adapter.register_uri('GET', 'mock://node1/volumes/a',
+                             text='<html>proxy</html>')
+
+        def broken(id):
+            raise KeyError(id)
+
+        batch = client.batch(concurrency=2)
+        batch.submit('volumes.get', 'a')
+        for id in ['b', 'c', 'd']:
+            batch.submit(broken, id)
+        results = sorted(batch.run())
+        # Each failure is reported with its own call
+        self.assertEqual(len(results), 4)
+        self.assertIsInstance(results[0].error, LunrHttpError)
+        self.assertEqual(results[0].error.code, 200)
+        self.assertEqual([type(r.error) for r in results[1:]], [KeyError] * 3)
+
+
+class TestCodec(TestCase):
+
+    def test_named_codec(self):
+        client = StorageClient("mock://", codec='json')
+        self.assertEqual(client.codec.name, 'json')
+        self.assertIs(client.volumes.codec, client.codec)
+
+        adapter = Adapter()
+        client.transport.session.mount('mock', adapter)
+        adapter.register_uri('GET', 'mock:///volumes',
+                             text=dumps([{'id': u'\u2603'}]))
+        self.assertEqual(client.volumes.list()[0]['id'], u'\u2603')
+
+    def test_unknown_codec(self):
+        self.assertRaises(LunrError, StorageClient, "mock://", codec='nope')
+
+
+class TestResponseCache(TestCase):
+
+    def setUp(self):
+        self.dir = mkdtemp()
+        self.adapter = Adapter()
+
+    def tearDown(self):
+        rmtree(self.dir)
+
+    def client(self, cache):
+        client = StorageClient('mock://storage', response_cache=cache)
+        client.transport.session.mount('mock', self.adapter)
+        return client
+
+    def test_ttl(self):
+        self.adapter.register_uri('GET', 'mock://storage/volumes',
+                                  text=dumps([{'id': 'thrawn'}]))
+        client = self.client(ResponseCache(ttls={'/volumes': 60}))
+        self.assertEqual(client.volumes.list()[0]['id'], 'thrawn')
+        self.assertEqual(client.volumes.list()[0]['id'], 'thrawn')
+        self.assertEqual(self.adapter.call_count, 1)
+        # Other endpoints are not cached without validators
+        self.adapter.register_uri('GET', 'mock://storage/status',
+                                  text=dumps({}))
+        client.status.list()
+        client.status.list()
+        self.assertEqual(self.adapter.call_count, 3)
+
+    def test_revalidate(self):
+        self.adapter.register_uri('GET', 'mock://storage/volumes', [
+            {'text': dumps([{'id': 'thrawn'}]), 'headers': {'ETag': '"1"'}},
+            {'status_code': 304, 'text': ''}])
+        client = self.client(ResponseCache())
+        client.volumes.list()
+        self.assertEqual(client.volumes.list()[0]['id'], 'thrawn')
+        self.assertEqual(self.adapter.last_request.headers['If-None-Match'],
+                         '"1"')
+
+    def test_write_invalidates(self):
+        self.adapter.register_uri('GET', 'mock://storage/volumes/thrawn',
+                                  text=dumps({'id': 'thrawn'}))
+        self.adapter.register_uri('DELETE', 'mock://storage/volumes/thrawn',
+                                  text=dumps({}))
+        client = self.client(ResponseCache(ttl=60, path=self.dir))
+        client.volumes.get('thrawn')
+        client.volumes.delete('thrawn')
+        client.volumes.get('thrawn')
+        self.assertEqual(self.adapter.call_count, 3)
+
+    def test_on_disk(self):
+        self.adapter.register_uri('GET', 'mock://storage/volumes',
+                                  text=dumps([{'id': 'thrawn'}]))
+        self.client(ResponseCache(ttl=60, path=self.dir)).volumes.list()
+        # A new process would find the entry on disk
+        client = self.client(ResponseCache(ttl=60, path=self.dir))
+        self.assertEqual(client.volumes.list()[0]['id'], 'thrawn')
+        self.assertEqual(self.adapter.call_count, 1)
+        for name in os.listdir(self.dir):
+            mode = os.stat(os.path.join(self.dir, name)).st_mode
+            self.assertEqual(stat.S_IMODE(mode), 0o600)
+
+    def test_lru(self):
+        cache = ResponseCache(ttl=60, max_entries=2)
+        for key in ('a', 'b', 'c'):
+            cache.put(key, '{}', {})
+        self.assertEqual(list(cache.entries), ['b', 'c'])
@@ -0,0 +1,89 @@
+# Copyright 2011-2016 Rackspace US, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from unittest import TestCase
+from lunrclient.client import LunrClient
+from lunrclient.directory import MISS_INTERVAL
+from lunrclient.transport import registry
+
+from requests_mock import Adapter
+from json import dumps
+
+
+def node(id, modified='2016-01-01', vtype='vtype'):
+    return {'id': id, 'name': 'name-%s' % id, 'hostname': 'host-%s' % id,
+            'port': 8081, 'volume_type_name': vtype,
+            'last_modified': modified}
+
+
+class TestNodeDirectory(TestCase):
+
+    def setUp(self):
+        self.client = LunrClient('admin', url='mock://api')
+        self.adapter = Adapter()
+        self.client.transport.session.mount('mock', self.adapter)
+        self.url = 'mock://api/v1.0/admin/nodes'
+
+    def tearDown(self):
+        registry.clear()
+
+    def test_indexes(self):
+        self.adapter.register_uri('GET', self.url, text=dumps([
+            node('1'), node('2', vtype='ssd'), node('3', vtype='ssd')]))
+        directory = self.client.directory
+        self.assertEqual(directory.get('1')['name'], 'name-1')
+        self.assertEqual(directory.by_name('name-2')['id'], '2')
+        self.assertEqual(directory.by_hostname('host-3')['id'], '3')
+        self.assertEqual(sorted(n['id'] for n in directory.of_type('ssd')),
+                         ['2', '3'])
+        # Loaded once for all the lookups
+        self.assertEqual(self.adapter.call_count, 1)
+
+    def test_refresh(self):
+        self.adapter.register_uri('GET', self.url, [
+            {'text': dumps([node('1'), node('2')])},
+            {'text': dumps([node('1'), node('2', modified='2016-02-01'),
+                            node('3')])}])
+        directory = self.client.directory
+        first = directory.get('1')
+        storage = directory.storage_client('2')
+        self.assertEqual(storage.url, 'http://host-2:8081')
+        self.assertIs(directory.storage_client('2'), storage)
+
+        directory.refresh()
+        # Unchanged nodes are kept, modified nodes are replaced
+        self.assertIs(directory.get('1'), first)
+        self.assertEqual(directory.get('2')['last_modified'], '2016-02-01')
+        self.assertIsNot(directory.storage_client('2'), storage)
+        self.assertEqual(directory.get('3')['name'], 'name-3')
+
+    def test_misses(self):
+        self.adapter.register_uri('GET', self.url, text=dumps([node('1')]))
+        directory = self.client.directory
+        self.assertIsNone(directory.get(None))
+        self.assertEqual(self.adapter.call_count, 0)
+        self.assertEqual(directory.get('1')['id'], '1')
+        # Long enough ago that a miss may refresh
+        directory.loaded -= MISS_INTERVAL + 1
+        self.assertIsNone(directory.get('unknown'))
+        self.assertEqual(self.adapter.call_count, 2)
+        directory.loaded -= MISS_INTERVAL + 1
+        # A key already missed does not refresh again
+        self.assertIsNone(directory.get('unknown'))
+        self.assertIsNone(directory.get(None))
+        self.assertEqual(self.adapter.call_count, 2)
+        # Until the directory expires
+        directory.loaded -= directory.max_age
+        self.assertIsNone(directory.get('unknown'))
+        self.assertEqual(self.adapter.call_count, 3)
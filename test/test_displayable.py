@@ -0,0 +1,158 @@
+# Copyright 2011-2016 Rackspace US, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from unittest import TestCase
+from lunrclient.displayable import Displayable
+from six.moves import StringIO
+import json
+import sys
+
+
+class Command(Displayable):
+
+    def __init__(self, output_format, max_width=None, max_rows=None):
+        self.output_format = output_format
+        self.max_width = max_width
+        self.max_rows = max_rows
+
+    def output(self, results, headers=None):
+        stdout, sys.stdout = sys.stdout, StringIO()
+        try:
+            self.display(results, headers)
+            self.note("a note for people")
+            return sys.stdout.getvalue()
+        finally:
+            sys.stdout = stdout
+
+
+def volumes():
+    yield {'id': 'vol-1', 'size': 1, 'status': 'ACTIVE'}
+    yield {'id': 'vol-2', 'size': 2, 'status': 'say "hi", ok'}
+
+
+class TestFormats(TestCase):
+
+    def test_json(self):
+        output = Command('json').output(volumes())
+        self.assertEqual(json.loads(output), list(volumes()))
+        output = Command('json').output({'id': 'vol-1'})
+        self.assertEqual(json.loads(output), {'id': 'vol-1'})
+
+    def test_jsonl(self):
+        lines = Command('jsonl').output(volumes()).splitlines()
+        self.assertEqual([json.loads(line) for line in lines],
+                         list(volumes()))
+
+    def test_csv(self):
+        output = Command('csv').output(volumes(), ['id', 'status'])
+        self.assertEqual(output, 'id,status\n'
+                                 'vol-1,ACTIVE\n'
+                                 'vol-2,"say ""hi"", ok"\n')
+
+    def test_tsv(self):
+        output = Command('tsv').output([{'id': 'vol-1', 'tags': [1]}],
+                                       ['id', 'tags', 'missing'])
+        self.assertEqual(output, 'id\ttags\tmissing\n'
+                                 'vol-1\t[1]\t\n')
+
+    def test_streams(self):
+        written = []
+
+        def records():
+            for i, volume in enumerate(volumes()):
+                # Every earlier record has been written already
+                written.append(len(sys.stdout.getvalue().splitlines()) == i)
+                yield volume
+
+        Command('jsonl').output(records())
+        self.assertEqual(written, [True, True])
+
+    def test_table(self):
+        output = Command('table').output(volumes(), ['id', 'size'])
+        self.assertIn('| vol-2 |  2   |', output)
+        self.assertIn('a note for people', output)
+
+
+class TestTable(TestCase):
+
+    def test_layout(self):
+        rows = [{'id': 'a', 'path': '/p', 'size': 1},
+                {'id': 'bbbbbbb', 'path': '/q/xyz', 'size': 22222,
+                 'extra': None}]
+        output = Command('table').output(rows, ['id', 'path', 'size',
+                                                'extra'])
+        self.assertEqual(output, '+---------+--------+-------+-------+\n'
+                                 '|    id   |  path  |  size | extra |\n'
+                                 '+---------+--------+-------+-------+\n'
+                                 '|    a    |   /p   |   1   |       |\n'
+                                 '| bbbbbbb | /q/xyz | 22222 |  None |\n'
+                                 '+---------+--------+-------+-------+\n'
+                                 'a note for people\n')
+
+    def test_max_width(self):
+        output = Command('table', max_width=6).output(
+            [{'id': 'vol-1234567890'}])
+        self.assertIn('| vol... |', output)
+
+    def test_max_rows(self):
+        read = []
+
+        def rows():
+            for i in range(1000):
+                read.append(i)
+                yield {'id': i}
+
+        output = Command('table', max_rows=2).output(rows())
+        self.assertIn('| 1  |', output)
+        self.assertNotIn('| 2  |', output)
+        self.assertIn('Only the first 2 rows shown', output)
+        # The listing is not read past the limit
+        self.assertEqual(len(read), 3)
+        output = Command('jsonl', max_rows=2).output(rows())
+        self.assertEqual(len(output.splitlines()), 2)
+
+    def test_closes_stream(self):
+        class Stream(object):
+            closed = False
+
+            def __iter__(self):
+                return iter([{'id': i} for i in range(5)])
+
+            def close(self):
+                self.closed = True
+
+        stream = Stream()
+        command = Command('table', max_rows=2)
+        self.assertTrue(command.incremental())
+        command.output(stream)
+        self.assertTrue(stream.closed)
+
+    def test_format(self):
+        output = Command('table').format({'a': [1, {'b': {}}]})
+        self.assertEqual(output, '    a: [\n'
+                                 '          1,\n'
+                                 '          {\n'
+                                 '              b: {}\n'
+                                 '            }\n'
+                                 '       ]')
+
+    def test_fields(self):
+        command = Command('jsonl')
+        command.fields = 'id, status'
+        lines = command.output(volumes()).splitlines()
+        self.assertEqual(json.loads(lines[0]),
+                         {'id': 'vol-1', 'status': 'ACTIVE'})
+        command = Command('table')
+        command.fields = 'size'
+        self.assertIn('| size |', command.output(volumes(), ['id']))
@@ -0,0 +1,122 @@
+# Copyright 2011-2016 Rackspace US, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from unittest import TestCase
+from lunrclient.client import LunrClient
+from lunrclient.exporter import Gauges, FleetCollector, Exporter
+from lunrclient.transport import registry
+
+from requests_mock import Adapter
+from json import dumps
+
+GB = 1024 ** 3
+
+
+class TestGauges(TestCase):
+
+    def test_render(self):
+        gauges = Gauges()
+        gauges.describe('lunr_volumes', "Volumes known to the api")
+        gauges.inc('lunr_volumes', status='ACTIVE')
+        gauges.inc('lunr_volumes', status='ACTIVE')
+        gauges.inc('lunr_volumes', status='say "hi"')
+        self.assertEqual(gauges.render(),
+                         '# HELP lunr_volumes Volumes known to the api\n'
+                         '# TYPE lunr_volumes gauge\n'
+                         'lunr_volumes{status="ACTIVE"} 2\n'
+                         'lunr_volumes{status="say \\"hi\\""} 1\n')
+
+
+class TestFleetCollector(TestCase):
+
+    def setUp(self):
+        self.client = LunrClient('admin', url='mock://api')
+        self.adapter = Adapter()
+        self.client.transport.session.mount('mock', self.adapter)
+        self.storage = Adapter()
+        registry.get('http://node1:8081').session.mount('http://node1',
+                                                        self.storage)
+        registry.get('http://node2:8081').session.mount('http://node2',
+                                                        self.storage)
+
+        def node(name):
+            return {'id': name, 'name': name, 'hostname': name,
+                    'port': 8081, 'status': 'ACTIVE', 'size': 100,
+                    'volume_type_name': 'vtype'}
+
+        self.adapter.register_uri('GET', 'mock://api/v1.0/admin/nodes',
+                                  text=dumps([node('node1'), node('node2')]))
+        self.adapter.register_uri('GET', 'mock://api/v1.0/admin/volumes',
+                                  text=dumps([
+                                      {'status': 'ACTIVE', 'size': 1,
+                                       'volume_type_name': 'vtype'},
+                                      {'status': 'ACTIVE', 'size': 2,
+                                       'volume_type_name': 'vtype'}]))
+        self.adapter.register_uri('GET', 'mock://api/v1.0/admin/backups',
+                                  text=dumps([{'status': 'AVAILABLE'}]))
+        self.storage.register_uri('GET', 'http://node1:8081/status',
+                                  text=dumps({'requests': 7, 'up': True}))
+        self.storage.register_uri('GET', 'http://node1:8081/volumes',
+                                  text=dumps([{'id': 'a', 'size': GB},
+                                              {'id': 'b', 'size': GB}]))
+        self.storage.register_uri('GET', 'http://node2:8081/status',
+                                  status_code=503, text='down')
+        self.storage.register_uri('GET', 'http://node2:8081/volumes',
+                                  status_code=503, text='down')
+
+    def tearDown(self):
+        registry.clear()
+
+    def test_collect(self):
+        lines = FleetCollector(self.client).collect().render().splitlines()
+        labels = 'node="%s",status="ACTIVE",volume_type="vtype"'
+        self.assertIn('lunr_node_up{%s} 1' % (labels % 'node1'), lines)
+        self.assertIn('lunr_node_up{%s} 0' % (labels % 'node2'), lines)
+        self.assertIn('lunr_node_volumes{%s} 2' % (labels % 'node1'), lines)
+        self.assertIn('lunr_node_volumes_gigabytes{%s} 2.0'
+                      % (labels % 'node1'), lines)
+        self.assertIn('lunr_node_status{key="requests",node="node1"} 7',
+                      lines)
+        self.assertIn('lunr_volumes{status="ACTIVE",volume_type="vtype"} 2',
+                      lines)
+        self.assertIn('lunr_volumes_gigabytes'
+                      '{status="ACTIVE",volume_type="vtype"} 3', lines)
+        self.assertIn('lunr_backups{status="AVAILABLE"} 1', lines)
+
+    def test_failed_sweep(self):
+        exporter = Exporter(FleetCollector(self.client))
+        exporter.update()
+        self.assertIn('lunr_backups{status="AVAILABLE"} 1',
+                      exporter.metrics())
+        self.adapter.register_uri('GET', 'mock://api/v1.0/admin/volumes',
+                                  status_code=500, text='error')
+        exporter.update()
+        # The previous sweep is still served
+        self.assertIn('lunr_backups{status="AVAILABLE"} 1',
+                      exporter.metrics())
+        self.assertIn('lunr_scrape_errors_total 1', exporter.metrics())
+        self.assertIn('# TYPE lunr_scrape_errors_total counter',
+                      exporter.metrics())
+
+    def test_unexpected_error(self):
+        class Broken(object):
+            def collect(self):
+                raise KeyError('size')
+
+        exporter = Exporter(Broken(), interval=0)
+        exporter.start()
+        exporter.thread.join(0.05)
+        exporter.stop()
+        # The sweeps carry on after the error
+        self.assertTrue(exporter.errors > 1)
@@ -0,0 +1,149 @@
+# Copyright 2011-2016 Rackspace US, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from unittest import TestCase
+from lunrclient.client import LunrClient
+from lunrclient.fleet import Fleet, ExportState
+from lunrclient.transport import registry
+
+from requests_mock import Adapter
+from json import dumps
+from threading import Event
+
+GB = 1024 ** 3
+
+
+def node(name):
+    return {'id': name, 'name': name, 'hostname': name, 'port': 8081,
+            'status': 'ACTIVE', 'volume_type_name': 'vtype'}
+
+
+class TestFleet(TestCase):
+
+    def setUp(self):
+        self.client = LunrClient('admin', url='http://api')
+        self.adapter = Adapter()
+        self.client.transport.session.mount('http://api', self.adapter)
+        self.storage = Adapter()
+        for name in ('node1', 'node2'):
+            registry.get('http://%s:8081' % name).session.mount(
+                'http://%s' % name, self.storage)
+        self.adapter.register_uri('GET', 'http://api/v1.0/admin/nodes',
+                                  text=dumps([node('node1'), node('node2')]))
+
+    def tearDown(self):
+        registry.clear()
+
+    def test_reconcile(self):
+        self.adapter.register_uri(
+            'GET', 'http://api/v1.0/admin/volumes?node_id=node1',
+            text=dumps([
+                {'id': 'ok', 'size': 1, 'status': 'ACTIVE'},
+                {'id': 'small', 'size': 2, 'status': 'ACTIVE'},
+                {'id': 'gone', 'size': 1, 'status': 'ACTIVE'},
+                {'id': 'new', 'size': 1, 'status': 'BUILDING'},
+                {'id': 'old', 'size': 1, 'status': 'DELETED'}]))
+        self.storage.register_uri('GET', 'http://node1:8081/volumes',
+                                  text=dumps([
+                                      {'id': 'ok', 'size': GB},
+                                      {'id': 'small', 'size': GB},
+                                      {'id': 'old', 'size': GB},
+                                      {'id': 'snap', 'size': GB,
+                                       'origin': 'ok'}]))
+        self.storage.register_uri('GET', 'http://node2:8081/volumes',
+                                  status_code=503, text='down')
+        self.adapter.register_uri(
+            'GET', 'http://api/v1.0/admin/volumes?node_id=node2',
+            text=dumps([]))
+
+        findings = sorted(Fleet(self.client).reconcile())
+        self.assertEqual([(f.node, f.volume_id, f.problem)
+                          for f in findings],
+                         [('node1', 'gone', 'missing'),
+                          ('node1', 'old', 'orphan'),
+                          ('node1', 'small', 'size'),
+                          ('node2', None, 'error')])
+        self.assertEqual(findings[2].api_size, 2 * GB)
+
+    def test_exports(self):
+        self.storage.register_uri('GET', 'http://node1:8081/volumes',
+                                  text=dumps([{'id': 'a'}, {'id': 'b'},
+                                              {'id': 'c'}]))
+        sessions = [{'ip': '1.1.1.1'}]
+        self.storage.register_uri('GET', 'http://node1:8081/volumes/a/export',
+                                  text=dumps({'name': 'iqn-a',
+                                              'sessions': sessions}))
+        self.storage.register_uri('GET', 'http://node1:8081/volumes/b/export',
+                                  text=dumps({'name': 'iqn-b',
+                                              'sessions': []}))
+        self.storage.register_uri('GET', 'http://node1:8081/volumes/c/export',
+                                  status_code=404, text='{}')
+        self.storage.register_uri('GET', 'http://node2:8081/volumes',
+                                  status_code=503, text='down')
+
+        states = sorted(Fleet(self.client).exports())
+        self.assertEqual([(s.node, s.volume_id, s.state, s.sessions)
+                          for s in states],
+                         [('node1', 'a', 'connected', '1.1.1.1'),
+                          ('node1', 'b', 'no-session', ''),
+                          ('node1', 'c', 'not-exported', ''),
+                          ('node2', None, 'error', '')])
+
+    def test_exports_unexpected_errors(self):
+        names = ['node%d' % i for i in range(1, 6)]
+        for name in names[2:]:
+            registry.get('http://%s:8081' % name).session.mount(
+                'http://%s' % name, self.storage)
+            self.storage.register_uri('GET', 'http://%s:8081/volumes' % name,
+                                      text='[]')
+        # A proxy answering with html instead of json
+        self.storage.register_uri('GET', 'http://node1:8081/volumes',
+                                  text='<html>proxy</html>')
+        fleet = Fleet(self.client, concurrency=2)
+        node_exports = fleet.node_exports
+
+        def broken(node, per_host, stop):
+            if node['name'] == 'node2':
+                raise KeyError('id')
+            return node_exports(node, per_host, stop)
+
+        fleet.node_exports = broken
+        states = sorted(fleet.exports([node(name) for name in names]))
+        self.assertEqual([(s.node, s.state) for s in states],
+                         [('node1', 'error'), ('node2', 'error')])
+
+    def test_exports_stopped_early(self):
+        names = ['node%d' % i for i in range(1, 6)]
+        fleet = Fleet(self.client, concurrency=1)
+        visited, done = [], Event()
+
+        def node_exports(node, per_host, stop):
+            visited.append(node['name'])
+            yield ExportState(node['name'], 'a', 'connected', '', None, None)
+            # Still visiting when the consumer stops reading
+            stop.wait(5)
+
+        run_visits = fleet.run_visits
+
+        def visits(*args):
+            run_visits(*args)
+            done.set()
+
+        fleet.node_exports = node_exports
+        fleet.run_visits = visits
+        states = fleet.exports([node(name) for name in names])
+        self.assertEqual(next(states).node, 'node1')
+        states.close()
+        self.assertTrue(done.wait(5))
+        self.assertEqual(visited, ['node1'])
@@ -0,0 +1,116 @@
+# Copyright 2011-2016 Rackspace US, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from unittest import TestCase
+from lunrclient.client import LunrClient
+from lunrclient.inventory import Inventory
+from lunrclient.base import LunrError
+
+from requests_mock import Adapter
+from tempfile import mkdtemp
+from shutil import rmtree
+from json import dumps
+import os
+
+
+def volume(id, status='ACTIVE', modified='2016-01-01', size=1):
+    return {'id': id, 'account_id': 'thrawn', 'node_id': 'node1',
+            'status': status, 'size': size, 'volume_type_name': 'vtype',
+            'last_modified': modified}
+
+
+class TestInventory(TestCase):
+
+    def setUp(self):
+        self.dir = mkdtemp()
+        self.inventory = Inventory(os.path.join(self.dir, 'inventory.db'))
+        self.client = LunrClient('admin', url='mock://api')
+        self.adapter = Adapter()
+        self.client.transport.session.mount('mock', self.adapter)
+        self.register('nodes', [{'id': 'node1', 'name': 'node1',
+                                 'volume_type_name': 'vtype'}])
+        self.register('accounts', [{'id': 'thrawn', 'status': 'ACTIVE'}])
+        self.register('backups', [])
+
+    def tearDown(self):
+        rmtree(self.dir)
+
+    def register(self, name, body, **kwargs):
+        self.adapter.register_uri('GET', 'mock://api/v1.0/admin/%s' % name,
+                                  text=dumps(body), **kwargs)
+
+    def test_incremental_sync(self):
+        self.register('volumes', [volume('1'), volume('2'), volume('3')])
+        self.adapter.register_uri('GET', 'mock://api/v1.0/admin/volumes/1/'
+                                  'export', text=dumps({'status': 'ATTACHED'}))
+        self.adapter.register_uri('GET', 'mock://api/v1.0/admin/volumes/2/'
+                                  'export', status_code=404, text='{}')
+        self.adapter.register_uri('GET', 'mock://api/v1.0/admin/volumes/3/'
+                                  'export', status_code=404, text='{}')
+        stats = self.inventory.sync(self.client, exports=True)
+        self.assertEqual(stats['volumes'], (3, 3, 0))
+        self.assertEqual(stats['exports'], (1, 1, 0))
+
+        self.register('volumes', [volume('1'),
+                                  volume('2', modified='2016-02-01',
+                                         size=600)])
+        stats = self.inventory.sync(self.client)
+        self.assertEqual(stats['volumes'], (2, 1, 1))
+
+        columns, rows = self.inventory.query(
+            "SELECT v.id, e.status AS export FROM volumes v "
+            "JOIN nodes n ON n.id = v.node_id "
+            "LEFT JOIN exports e ON e.id = v.id "
+            "WHERE v.size > ? ORDER BY v.id", (500,))
+        self.assertEqual(columns, ['id', 'export'])
+        self.assertEqual(rows, [{'id': '2', 'export': None}])
+
+    def test_streams_in_turn(self):
+        self.register('volumes', [volume('1')])
+        self.inventory.sync(self.client)
+        paths = [request.path for request in self.adapter.request_history]
+        self.assertEqual(sorted(paths[:2]), ['/v1.0/admin/accounts',
+                                             '/v1.0/admin/nodes'])
+        self.assertEqual(paths[2:], ['/v1.0/admin/volumes',
+                                     '/v1.0/admin/backups'])
+
+    def test_stale_exports(self):
+        self.register('volumes', [volume('1'), volume('2')])
+        url = 'mock://api/v1.0/admin/volumes/%s/export'
+        self.adapter.register_uri('GET', url % '1',
+                                  text=dumps({'status': 'ATTACHED'}))
+        self.adapter.register_uri('GET', url % '2', status_code=404,
+                                  text='{}')
+        self.inventory.sync(self.client, exports=True)
+        # Detached and attached without changing the volumes
+        self.adapter.register_uri('GET', url % '1', status_code=404,
+                                  text='{}')
+        self.adapter.register_uri('GET', url % '2',
+                                  text=dumps({'status': 'ATTACHED'}))
+        stats = self.inventory.sync(self.client, exports=True)
+        self.assertEqual(stats['exports'], (1, 0, 0))
+        stats = self.inventory.sync(self.client, exports=True,
+                                    export_max_age=-1)
+        self.assertEqual(stats['exports'], (1, 1, 1))
+        columns, rows = self.inventory.query("SELECT id FROM exports")
+        self.assertEqual(rows, [{'id': '2'}])
+
+    def test_read_only(self):
+        self.register('volumes', [volume('1')])
+        self.inventory.sync(self.client)
+        self.assertRaises(LunrError, self.inventory.query,
+                          "DELETE FROM volumes")
+        columns, rows = self.inventory.query("SELECT count(*) AS n "
+                                             "FROM volumes")
+        self.assertEqual(rows, [{'n': 1}])
@@ -0,0 +1,137 @@
+# Copyright 2011-2016 Rackspace US, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from unittest import TestCase
+from lunrclient.base import response
+from lunrclient.client import LunrClient
+from lunrclient.lunr_shell import Node, Volume
+from lunrclient.transport import registry
+
+from requests_mock import Adapter
+from six.moves import StringIO
+from json import dumps, loads
+import sys
+
+
+NODES = [{'id': 'a', 'status': 'ACTIVE', 'volume_type_name': 'vtype'},
+         {'id': 'b', 'status': 'ACTIVE', 'volume_type_name': 'other'},
+         {'id': 'c', 'status': 'DISABLED', 'volume_type_name': 'vtype'}]
+
+
+class TestFilter(TestCase):
+
+    def test_every_key_matches(self):
+        result = Node().filter(response(NODES, 200),
+                               {'status': 'ACTIVE',
+                                'volume_type_name': 'vtype'})
+        # Each item appears once, even though it matches both keys
+        self.assertEqual([node['id'] for node in result], ['a'])
+        self.assertEqual(result.get_code(), 200)
+
+    def test_iterable(self):
+        result = Node().filter(iter(NODES), {'volume_type_name': 'vtype'})
+        self.assertFalse(isinstance(result, list))
+        self.assertEqual([node['id'] for node in result], ['a', 'c'])
+
+    def test_missing_key(self):
+        result = Node().filter(NODES, {'hostname': 'node1'})
+        self.assertEqual(list(result), [])
+
+
+def capture(method, *args, **kwargs):
+    """ Return what 'method' returned and what it printed """
+    stdout, sys.stdout = sys.stdout, StringIO()
+    try:
+        return method(*args, **kwargs), sys.stdout.getvalue()
+    finally:
+        sys.stdout = stdout
+
+
+class TestReconcile(TestCase):
+
+    def setUp(self):
+        self.node = Node()
+        self.node.output_format = 'jsonl'
+        self.node.client = LunrClient('admin', url='http://api')
+        self.adapter = Adapter()
+        self.node.client.transport.session.mount('http://api', self.adapter)
+        self.storage = Adapter()
+        registry.get('http://node1:8081').session.mount('http://node1',
+                                                        self.storage)
+        self.adapter.register_uri('GET', 'http://api/v1.0/admin/nodes',
+                                  text=dumps([{'id': 'node1',
+                                               'name': 'node1',
+                                               'hostname': 'node1',
+                                               'port': 8081,
+                                               'status': 'ACTIVE',
+                                               'volume_type_name': 'vtype'}]))
+        self.adapter.register_uri(
+            'GET', 'http://api/v1.0/admin/volumes?node_id=node1',
+            text=dumps([]))
+
+    def tearDown(self):
+        registry.clear()
+
+    def test_streamed_findings(self):
+        self.storage.register_uri('GET', 'http://node1:8081/volumes',
+                                  text=dumps([{'id': 'orphan', 'size': 1}]))
+        code, output = capture(self.node.reconcile)
+        self.assertEqual(code, 1)
+        findings = [loads(line) for line in output.splitlines()]
+        self.assertEqual([(finding['volume_id'], finding['problem'])
+                          for finding in findings], [('orphan', 'orphan')])
+
+    def test_streamed_no_findings(self):
+        self.storage.register_uri('GET', 'http://node1:8081/volumes',
+                                  text=dumps([]))
+        code, output = capture(self.node.reconcile)
+        self.assertEqual(code, 0)
+        self.assertEqual(output, '')
+
+
+class TestVolumeGet(TestCase):
+
+    def setUp(self):
+        self.volume = Volume()
+        self.volume.client = LunrClient('admin', url='http://api')
+        self.volume.admin_client = lambda: self.volume.client
+        adapter = Adapter()
+        self.volume.client.transport.session.mount('http://api', adapter)
+        adapter.register_uri('GET', 'http://api/v1.0/admin/volumes/vol1',
+                             text=dumps({'id': 'vol1', 'node_id': 'node1',
+                                         'status': 'ACTIVE', 'size': 1}))
+        adapter.register_uri('GET', 'http://api/v1.0/admin/nodes',
+                             text=dumps([{'id': 'node1', 'name': 'node1',
+                                          'hostname': 'node1', 'port': 8081,
+                                          'status': 'ACTIVE',
+                                          'volume_type_name': 'vtype'}]))
+        storage = Adapter()
+        registry.get('http://node1:8081').session.mount('http://node1',
+                                                        storage)
+        storage.register_uri('GET', 'http://node1:8081/volumes/vol1/export',
+                             status_code=404, text='{}')
+
+    def tearDown(self):
+        registry.clear()
+
+    def test_summary_note(self):
+        self.volume.output_format = 'table'
+        output = capture(self.volume.get, 'vol1')[1]
+        self.assertTrue('This is a summary' in output)
+
+    def test_json_summary(self):
+        self.volume.output_format = 'json'
+        output = capture(self.volume.get, 'vol1')[1]
+        # Only the volume, without the note for people
+        self.assertEqual(loads(output)['iqn'], '(not exported)')
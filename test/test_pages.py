@@ -0,0 +1,77 @@
+# Copyright 2011-2016 Rackspace US, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from unittest import TestCase
+from lunrclient.client import LunrClient
+
+from requests_mock import Adapter
+from json import dumps
+
+
+VOLUMES = [{'id': 'vol-%02d' % i, 'status': 'ERROR' if i == 4 else 'ACTIVE'}
+           for i in range(10)]
+
+
+def paginated(request, context):
+    """ Answer like an api that supports limit and marker """
+    limit = int(request.qs['limit'][0])
+    start = 0
+    if 'marker' in request.qs:
+        ids = [volume['id'] for volume in VOLUMES]
+        start = ids.index(request.qs['marker'][0]) + 1
+    return dumps(VOLUMES[start:start + limit])
+
+
+class TestPages(TestCase):
+
+    def setUp(self):
+        self.client = LunrClient('admin', url='http://api')
+        self.adapter = Adapter()
+        self.client.transport.session.mount('http://api', self.adapter)
+        self.url = 'http://api/v1.0/admin/volumes'
+
+    def test_pages(self):
+        self.adapter.register_uri('GET', self.url, text=paginated)
+        volumes = list(self.client.iter_volumes(limit=3))
+        self.assertEqual(volumes, VOLUMES)
+        # Three full pages and the last partial one
+        self.assertEqual(self.adapter.call_count, 4)
+
+    def test_stop_early(self):
+        self.adapter.register_uri('GET', self.url, text=paginated)
+        for volume in self.client.iter_volumes(limit=3):
+            if volume['status'] == 'ERROR':
+                break
+        self.assertEqual(volume['id'], 'vol-04')
+        self.assertEqual(self.adapter.call_count, 2)
+
+    def test_prefetch(self):
+        self.adapter.register_uri('GET', self.url, text=paginated)
+        volumes = list(self.client.iter_volumes(limit=4, prefetch=True))
+        self.assertEqual(volumes, VOLUMES)
+        self.assertEqual(self.adapter.call_count, 3)
+
+    def test_limit_ignored(self):
+        self.adapter.register_uri('GET', self.url, text=dumps(VOLUMES))
+        self.assertEqual(list(self.client.iter_volumes(limit=3)), VOLUMES)
+        self.assertEqual(self.adapter.call_count, 1)
+
+    def test_marker_ignored(self):
+        def first_page(request, context):
+            if 'limit' in request.qs:
+                return dumps(VOLUMES[:5])
+            return dumps(VOLUMES)
+
+        self.adapter.register_uri('GET', self.url, text=first_page)
+        self.assertEqual(list(self.client.iter_volumes(limit=5)), VOLUMES)
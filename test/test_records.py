@@ -0,0 +1,95 @@
+# Copyright 2011-2016 Rackspace US, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from unittest import TestCase
+from lunrclient.client import LunrClient
+from lunrclient.records import Record, Volume, Export, plain
+
+from requests_mock import Adapter
+import json
+
+
+VOLUME = {'id': 'vol-1', 'status': 'ACTIVE', 'size': 1, 'node_id': 'node-1',
+          'restore_of': None, 'cinder_host': 'cinder-1'}
+
+
+class TestRecords(TestCase):
+
+    def test_mapping(self):
+        volume = Volume(VOLUME)
+        self.assertEqual(volume['status'], 'ACTIVE')
+        self.assertEqual(volume.status, 'ACTIVE')
+        self.assertEqual(volume['cinder_host'], 'cinder-1')
+        self.assertEqual(volume.get('account_id', 'none'), 'none')
+        self.assertRaises(KeyError, lambda: volume['account_id'])
+        self.assertTrue('restore_of' in volume)
+        self.assertFalse('account_id' in volume)
+        self.assertEqual(volume, VOLUME)
+        self.assertEqual(dict(volume), VOLUME)
+        volume['node-name'] = 'name-1'
+        self.assertEqual(volume['node-name'], 'name-1')
+        self.assertEqual(json.loads(json.dumps(volume, default=plain)),
+                         dict(VOLUME, **{'node-name': 'name-1'}))
+
+    def test_no_dict(self):
+        volume = Volume(VOLUME)
+        self.assertFalse(hasattr(volume, '__dict__'))
+        self.assertRaises(AttributeError, setattr, volume, 'other', 1)
+
+    def test_interned(self):
+        first = Volume(json.loads(json.dumps(VOLUME)))
+        second = Volume(json.loads(json.dumps(VOLUME)))
+        self.assertTrue(first.status is second.status)
+        self.assertTrue(first.node_id is second.node_id)
+        # Ids have too many values to be worth sharing
+        self.assertFalse(first.id is second.id)
+
+
+class TestClientRecords(TestCase):
+
+    def setUp(self):
+        self.adapter = Adapter()
+        self.adapter.register_uri('GET', 'mock://api/v1.0/admin/volumes',
+                                  text=json.dumps([VOLUME, VOLUME]))
+
+    def client(self, records):
+        client = LunrClient('admin', url='mock://api', records=records)
+        client.transport.session.mount('mock', self.adapter)
+        return client
+
+    def test_list(self):
+        volumes = self.client(True).volumes.list()
+        self.assertTrue(all(isinstance(v, Volume) for v in volumes))
+        self.assertEqual(volumes.get_code(), 200)
+        self.assertEqual(volumes, [VOLUME, VOLUME])
+
+    def test_stream(self):
+        volumes = list(self.client(True).volumes.stream())
+        self.assertTrue(all(isinstance(v, Record) for v in volumes))
+        with self.client(True).volumes.stream() as volumes:
+            self.assertEqual(next(volumes), VOLUME)
+        self.assertTrue(volumes.stream.resp.raw.closed)
+
+    def test_export(self):
+        self.adapter.register_uri(
+            'GET', 'mock://api/v1.0/admin/volumes/vol-1/export',
+            text=json.dumps({'id': 'vol-1', 'status': 'ATTACHED'}))
+        export = self.client(True).exports.get('vol-1')
+        self.assertIsInstance(export, Export)
+        self.assertEqual(export.get_code(), 200)
+        self.assertEqual(export['status'], 'ATTACHED')
+
+    def test_off(self):
+        volumes = self.client(False).volumes.list()
+        self.assertTrue(all(type(v) is dict for v in volumes))
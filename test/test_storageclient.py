@@ -47,3 +47,15 @@ class TestStorageClient(TestCase):
         self.assertIn('origin', volumes[0])
         self.assertIn('path', volumes[0])
         self.assertIn('size', volumes[0])
+
+    def test_shared_transport(self):
+        client = StorageClient("mock://", pool_size=4)
+
+        # Every resource api should use the same pooled session
+        self.assertIs(client.volumes.session, client.transport.session)
+        self.assertIs(client.backups.session, client.transport.session)
+        self.assertIs(client.exports.session, client.transport.session)
+        self.assertIs(client.status.session, client.transport.session)
+
+        adapter = client.transport.session.get_adapter('http://localhost')
+        self.assertEqual(adapter._pool_maxsize, 4)
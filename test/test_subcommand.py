@@ -13,8 +13,12 @@
 # limitations under the License.
 
 from lunrclient.subcommand import SubCommand, SubCommandParser, opt, noargs
+from lunrclient.subcommand import LazySubCommand, SubCommandError
 from argparse import ArgumentParser
+from os.path import join, exists
+from tempfile import mkdtemp
 from unittest import TestCase
+from shutil import rmtree
 
 
 class Api(SubCommand):
@@ -64,3 +68,38 @@ class TestSubCommands(TestCase):
         result = self.parser.run('api'.split())
         self.assertEqual(result, "help")
 
+
+class TestLazySubCommands(TestCase):
+
+    def test_constructed_on_use(self):
+        parser = SubCommandParser([LazySubCommand('api', Api)])
+        self.assertIsInstance(parser.sub_commands['api'], LazySubCommand)
+
+        result = parser.run('api create --name derrick'.split())
+        self.assertEqual(result, "create: derrick")
+        self.assertIsInstance(parser.sub_commands['api'], Api)
+
+    def test_import_error(self):
+        parser = SubCommandParser([
+            LazySubCommand('missing', 'lunrclient.no_such_module:Missing')])
+        self.assertRaises(SubCommandError, parser.run, ['missing'])
+
+    def test_completion_index(self):
+        directory = mkdtemp()
+        try:
+            cache = join(directory, 'completion')
+            parser = SubCommandParser([LazySubCommand('api', Api)],
+                                      completion_cache=cache)
+            self.assertEqual(sorted(parser.completion_index()['api']),
+                             ['create', 'list'])
+            # The sub command was never constructed
+            self.assertIsInstance(parser.sub_commands['api'], LazySubCommand)
+            self.assertTrue(exists(cache))
+
+            # A second parser answers from the cache
+            parser = SubCommandParser([LazySubCommand('api', 'no.such:Api')],
+                                      completion_cache=cache)
+            self.assertEqual(sorted(parser.completion_index()['api']),
+                             ['create', 'list'])
+        finally:
+            rmtree(directory)
@@ -0,0 +1,43 @@
+# Copyright 2011-2016 Rackspace US, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from unittest import TestCase
+from lunrclient.transport import TransportRegistry
+
+
+class TestTransportRegistry(TestCase):
+
+    def test_same_host(self):
+        registry = TransportRegistry()
+        first = registry.get('http://node1:8081/volumes')
+        self.assertIs(registry.get('http://node1:8081'), first)
+        self.assertIsNot(registry.get('http://node2:8081'), first)
+        self.assertEqual(len(registry), 2)
+
+    def test_lru_eviction(self):
+        registry = TransportRegistry(max_hosts=2)
+        first = registry.get('http://node1:8081')
+        registry.get('http://node2:8081')
+        # Touch node1 so node2 becomes the least recently used
+        registry.get('http://node1:8081')
+        registry.get('http://node3:8081')
+
+        self.assertEqual(len(registry), 2)
+        self.assertIs(registry.get('http://node1:8081'), first)
+        self.assertNotIn('http://node2:8081', registry.transports)
+
+    def test_idle_timeout(self):
+        registry = TransportRegistry(idle_timeout=0)
+        first = registry.get('http://node1:8081')
+        self.assertIsNot(registry.get('http://node1:8081'), first)